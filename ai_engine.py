@@ -1,38 +1,150 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+import hashlib
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+from sklearn.feature_extraction.text import CountVectorizer
+from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline, StoppingCriteria, StoppingCriteriaList
 from keybert import KeyBERT
+from model_store import SUMMARIZER_MODEL, model_source, model_load_kwargs
+from extractive import extractive_summary, split_sentences
 from transformers import (
     T5Tokenizer, T5ForConditionalGeneration,
     BartTokenizer, BartForConditionalGeneration
 )
 
-# BART для повного summary
-bart_tokenizer = BartTokenizer.from_pretrained('facebook/bart-large-cnn')
-bart_model = BartForConditionalGeneration.from_pretrained('facebook/bart-large-cnn')
+# ————————————————————————————————————————————
+# Паралелізм CPU-інференсу.
+# TORCH_INTRA_OP_THREADS / TORCH_INTER_OP_THREADS — розмір пулів PyTorch для процесу;
+# MODEL_THREADS="bart=4,t5=2" — intra-op потоки для викликів конкретної моделі
+# (з OpenMP-бекендом torch.set_num_threads діє на потік, що викликає модель);
+# MODEL_CONCURRENCY="bart=1,t5=2" — скільки викликів моделі може йти одночасно.
+CPU_COUNT = os.cpu_count() or 1
+TORCH_INTRA_OP_THREADS = int(os.getenv("TORCH_INTRA_OP_THREADS", 0))
+TORCH_INTER_OP_THREADS = int(os.getenv("TORCH_INTER_OP_THREADS", 0))
+MODEL_NAMES = ('bart', 't5', 'keepit', 'sentiment', 'spoiler', 'embedding')
+
+def _parse_model_map(value, default):
+    result = {name: default for name in MODEL_NAMES}
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        name, _, number = item.partition('=')
+        result[name.strip()] = int(number)
+    return result
+
+if TORCH_INTRA_OP_THREADS:
+    torch.set_num_threads(TORCH_INTRA_OP_THREADS)
+if TORCH_INTER_OP_THREADS:
+    try:
+        torch.set_num_interop_threads(TORCH_INTER_OP_THREADS)
+    except RuntimeError as e:
+        # Дозволено лише до першої паралельної роботи в процесі
+        print(f"⚠️ Не вдалося задати inter-op потоки: {e}")
+
+MODEL_THREADS = _parse_model_map(os.getenv("MODEL_THREADS"), torch.get_num_threads())
+MODEL_CONCURRENCY = _parse_model_map(os.getenv("MODEL_CONCURRENCY"),
+                                     max(1, CPU_COUNT // max(1, torch.get_num_threads())))
+_model_slots = {name: threading.BoundedSemaphore(n) for name, n in MODEL_CONCURRENCY.items()}
+
+@contextmanager
+def model_slot(name):
+    """
+    Обмежує кількість одночасних викликів моделі та задає їй intra-op потоки.
+    """
+    with _model_slots[name]:
+        torch.set_num_threads(MODEL_THREADS[name])
+        yield
+
+# Усі моделі беруться з локального каталогу safetensors (model_store.py prefetch), якщо він є
+
+# BART для повного summary; можна підмінити дистильованою моделлю,
+# напр. SUMMARIZER_MODEL=sshleifer/distilbart-cnn-12-6 (перевірка якості — evaluate_summarizer.py)
+def load_summarizer(name):
+    return (BartTokenizer.from_pretrained(model_source(name)),
+            BartForConditionalGeneration.from_pretrained(model_source(name), **model_load_kwargs(name)))
+
+bart_tokenizer, bart_model = load_summarizer(SUMMARIZER_MODEL)
 
 # Sentiment pipeline
-sentiment_pipeline = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+sentiment_pipeline = pipeline("sentiment-analysis", model=model_source(SENTIMENT_MODEL),
+                              model_kwargs=model_load_kwargs(SENTIMENT_MODEL))
 
 # T5 для коротших summary
-t5_tokenizer = T5Tokenizer.from_pretrained("t5-small")
-t5_model = T5ForConditionalGeneration.from_pretrained("t5-small")
+t5_tokenizer = T5Tokenizer.from_pretrained(model_source("t5-small"))
+t5_model = T5ForConditionalGeneration.from_pretrained(model_source("t5-small"), **model_load_kwargs("t5-small"))
 
 # Ключові слова
-kw_model = KeyBERT(model='all-MiniLM-L6-v2')
+kw_model = KeyBERT(model=model_source('sentence-transformers/all-MiniLM-L6-v2'))
+
+# LRU-кеш ембеддингів n-грам-кандидатів: лексика рецензій сильно повторюється між запитами
+KEYWORD_VOCAB_CACHE_SIZE = int(os.getenv("KEYWORD_VOCAB_CACHE_SIZE", 50000))
+_vocab_cache = OrderedDict()
+_vocab_lock = threading.Lock()
 
-# Модель спрощення тексту
-simple_tokenizer = AutoTokenizer.from_pretrained("philippelaban/keep_it_simple")
-simple_model = AutoModelForCausalLM.from_pretrained("philippelaban/keep_it_simple")
+# Модель спрощення тексту — потрібна лише adapt_summary_by_age, тому вантажиться при першому виклику
+simple_tokenizer = None
+simple_model = None
+_simple_lock = threading.Lock()
+
+# Режим узагальнення:
+#   'per_age'     — окремий прогін моделі на кожну вікову групу;
+#   'shared_base' — одне базове BART summary на текст, коротші варіанти виводяться з нього
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "per_age")
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", 1000))
+
+# Бюджет генерації: max_len/min_len — лише стеля, фактична довжина пропорційна входу в токенах
+DYNAMIC_BUDGETS = os.getenv("DYNAMIC_BUDGETS", "1") == "1"
+SUMMARY_LENGTH_RATIO = float(os.getenv("SUMMARY_LENGTH_RATIO", 0.35))
+SUMMARY_MIN_TOKENS = int(os.getenv("SUMMARY_MIN_TOKENS", 30))
+# 'beam' — 4 промені (як раніше), 'greedy' — швидкий режим без beam search
+GENERATION_MODE = os.getenv("GENERATION_MODE", "beam")
+# Скільки текстів генерується одним викликом generate в офлайн-обробці (run_analysis_batch)
+GENERATION_BATCH_SIZE = int(os.getenv("GENERATION_BATCH_SIZE", 8))
+# Екстрактивне summary: TF-IDF (за замовчуванням) або ембеддинги речень MiniLM
+EXTRACTIVE_EMBEDDINGS = os.getenv("EXTRACTIVE_EMBEDDINGS", "0") == "1"
+
+# Частки часу запиту на етапи run_analysis (від часу, що залишився на момент етапу)
+SPOILER_STAGE_SHARE = float(os.getenv("SPOILER_STAGE_SHARE", 0.2))
+SUMMARY_STAGE_SHARE = float(os.getenv("SUMMARY_STAGE_SHARE", 0.85))
 
 # ✅ Робоча модель для виявлення спойлерів
-spoiler_detector = pipeline("text-classification", model="eesuan/imdb-spoiler-distilbert")
+SPOILER_MODEL = "eesuan/imdb-spoiler-distilbert"
+spoiler_detector = pipeline("text-classification", model=model_source(SPOILER_MODEL),
+                            model_kwargs=model_load_kwargs(SPOILER_MODEL))
 
 # ————————————————————————————————————————————
-def remove_spoilers(text, threshold=0.8):
+class DeadlineStoppingCriteria(StoppingCriteria):
+    """
+    Зупиняє generate, щойно минув дедлайн або запит скасовано; повертається вже згенерована частина.
+    """
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return self.deadline.expired()
+
+def _stopping_criteria(deadline):
+    return StoppingCriteriaList([DeadlineStoppingCriteria(deadline)]) if deadline else None
+
+def filter_spoilers(text, threshold=0.8, deadline=None):
+    """
+    :return: (текст без спойлерів, complete) — complete=False, якщо дедлайн перервав перевірку
+             і решту речень залишено без фільтрації
+    """
     sentences = text.split('. ')
     non_spoilers = []
-    for s in sentences:
+    for i, s in enumerate(sentences):
+        if deadline and deadline.expired():
+            print(f"⏰ Дедлайн фільтра спойлерів — {len(sentences) - i} речень без перевірки")
+            non_spoilers.extend(sentences[i:])
+            return '. '.join(non_spoilers), False
         try:
-            result = spoiler_detector(s[:512])[0]
+            with model_slot('spoiler'):
+                result = spoiler_detector(s[:512])[0]
             label = result['label']
             score = result['score']
             print(f"{label} ({score:.2f}) → {s}")
@@ -42,26 +154,160 @@ def remove_spoilers(text, threshold=0.8):
         except Exception as e:
             print("Error:", e)
             continue
-    return '. '.join(non_spoilers)
+    return '. '.join(non_spoilers), True
+
+def remove_spoilers(text, threshold=0.8):
+    return filter_spoilers(text, threshold)[0]
+
+def remove_spoilers_batch(texts, threshold=0.8, batch_size=32):
+    """
+    Те саме, що remove_spoilers, але речення всіх текстів класифікуються одним батчем.
+    """
+    split = [text.split('. ') for text in texts]
+    flat = [s[:512] for sentences in split for s in sentences]
+    try:
+        with model_slot('spoiler'):
+            results = spoiler_detector(flat, batch_size=batch_size)
+    except Exception as e:
+        print("Error:", e)
+        return [remove_spoilers(text, threshold) for text in texts]
+
+    cleaned = []
+    pos = 0
+    for sentences in split:
+        non_spoilers = []
+        for s in sentences:
+            result = results[pos]
+            pos += 1
+            if result['label'] == 'LABEL_0' or result['score'] < threshold:
+                non_spoilers.append(s)
+        cleaned.append('. '.join(non_spoilers))
+    return cleaned
+
 
+def generation_budget(input_tokens, max_len, min_len, dynamic=None):
+    """
+    Ліміти генерації з урахуванням довжини входу.
+    :return: (max_length, min_length)
+    """
+    if dynamic is None:
+        dynamic = DYNAMIC_BUDGETS
+    if not dynamic:
+        return max_len, min_len
+    max_len = min(max_len, max(SUMMARY_MIN_TOKENS, int(input_tokens * SUMMARY_LENGTH_RATIO)))
+    min_len = min(min_len, max_len // 2)
+    return max_len, min_len
 
-def simplify_with_t5(text, max_len=120):
+def generation_kwargs(fast=None):
+    if fast is None:
+        fast = GENERATION_MODE == 'greedy'
+    if fast:
+        return {'num_beams': 1, 'do_sample': False}
+    return {'num_beams': 4, 'length_penalty': 2.0, 'early_stopping': True}
+
+def simplify_with_t5(text, max_len=120, fast=None, dynamic=None, deadline=None):
     input_text = "summarize: " + text
     inputs = t5_tokenizer.encode(input_text, return_tensors="pt", max_length=512, truncation=True)
-    summary_ids = t5_model.generate(inputs, max_length=max_len, min_length=30, length_penalty=2.0, num_beams=4, early_stopping=True)
+    max_len, min_len = generation_budget(inputs.shape[1], max_len, 30, dynamic)
+    with model_slot('t5'):
+        summary_ids = t5_model.generate(inputs, max_length=max_len, min_length=min_len,
+                                        stopping_criteria=_stopping_criteria(deadline), **generation_kwargs(fast))
     return t5_tokenizer.decode(summary_ids[0], skip_special_tokens=True)
 
-def summarize_with_bart(text, max_len=200, min_len=100):
-    inputs = bart_tokenizer([text], max_length=1024, return_tensors='pt', truncation=True)
-    summary_ids = bart_model.generate(inputs['input_ids'], num_beams=4, max_length=max_len, min_length=min_len, length_penalty=2.0, early_stopping=True)
-    return bart_tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+def summarize_with(tokenizer, model, text, max_len=200, min_len=100, fast=None, dynamic=None, deadline=None):
+    inputs = tokenizer([text], max_length=1024, return_tensors='pt', truncation=True)
+    max_len, min_len = generation_budget(inputs['input_ids'].shape[1], max_len, min_len, dynamic)
+    with model_slot('bart'):
+        summary_ids = model.generate(inputs['input_ids'], max_length=max_len, min_length=min_len,
+                                     stopping_criteria=_stopping_criteria(deadline), **generation_kwargs(fast))
+    return tokenizer.decode(summary_ids[0], skip_special_tokens=True)
+
+def summarize_with_bart(text, max_len=200, min_len=100, fast=None, dynamic=None, deadline=None):
+    return summarize_with(bart_tokenizer, bart_model, text, max_len, min_len, fast, dynamic, deadline)
+
+def classify_sentiment(texts):
+    with model_slot('sentiment'):
+        return [r['label'] for r in sentiment_pipeline(texts, batch_size=16, truncation=True)]
+
+def embed_text(text):
+    """
+    Ембеддинг тексту тією ж MiniLM-моделлю, що використовує KeyBERT.
+    """
+    with model_slot('embedding'):
+        return kw_model.model.embed([text])[0]
+
+def embed_candidates(words):
+    """
+    Ембеддинги n-грам через LRU-кеш; модель рахує лише ті, яких ще немає в кеші.
+    Модель ніколи не викликається під _vocab_lock.
+    """
+    with _vocab_lock:
+        found = {w: _vocab_cache[w] for w in words if w in _vocab_cache}
+    missing = [w for w in dict.fromkeys(words) if w not in found]
+    if missing:
+        with model_slot('embedding'):
+            vectors = kw_model.model.embed(missing)
+        fresh = dict(zip(missing, vectors))
+        with _vocab_lock:
+            _vocab_cache.update(fresh)
+            while len(_vocab_cache) > KEYWORD_VOCAB_CACHE_SIZE:
+                _vocab_cache.popitem(last=False)
+        found.update(fresh)
+    with _vocab_lock:
+        for w in found:
+            if w in _vocab_cache:
+                _vocab_cache.move_to_end(w)
+    return np.stack([found[w] for w in words])
+
+def extract_keywords(text, doc_embedding=None, top_n=5):
+    """
+    KeyBERT з готовим ембеддингом документа та кешованими ембеддингами кандидатів.
+    """
+    vectorizer = CountVectorizer(ngram_range=(1, 2), stop_words='english')
+    try:
+        words = vectorizer.fit([text]).get_feature_names_out()
+    except ValueError:
+        # Порожній словник (текст зі стоп-слів або порожній)
+        return []
+    if doc_embedding is None:
+        doc_embedding = embed_text(text)
+    keywords = kw_model.extract_keywords(
+        text,
+        vectorizer=vectorizer,
+        top_n=top_n,
+        doc_embeddings=np.asarray(doc_embedding).reshape(1, -1),
+        word_embeddings=embed_candidates(list(words))
+    )
+    return [kw for kw, _ in keywords]
+
+def _load_keepit():
+    global simple_tokenizer, simple_model
+    with _simple_lock:
+        if simple_model is None:
+            name = "philippelaban/keep_it_simple"
+            simple_tokenizer = AutoTokenizer.from_pretrained(model_source(name))
+            simple_model = AutoModelForCausalLM.from_pretrained(model_source(name), **model_load_kwargs(name))
 
 def simplify_text_with_keepit(text, max_tokens=100):
+    _load_keepit()
     inputs = simple_tokenizer.encode(text, return_tensors='pt', truncation=True, max_length=512)
-    outputs = simple_model.generate(inputs, max_new_tokens=max_tokens, do_sample=False)
+    with model_slot('keepit'):
+        outputs = simple_model.generate(inputs, max_new_tokens=max_tokens, do_sample=False)
     return simple_tokenizer.decode(outputs[0], skip_special_tokens=True)
 
 # ————————————————————————————————————————————
+# Вікові групи, для яких run_summary_adapted дає різні результати, і типовий вік кожної
+AGE_BUCKETS = {'default': None, 'kids': 10, 'teens': 15, 'adults': 30}
+
+def age_bucket(age):
+    if age is None:
+        return 'default'
+    if age <= 12:
+        return 'kids'
+    elif age <= 17:
+        return 'teens'
+    return 'adults'
+
 def adapt_summary_by_age(summary, age):
     if age is None:
         return summary
@@ -72,44 +318,297 @@ def adapt_summary_by_age(summary, age):
     else:
         return summary
 
-def run_summary_adapted(text, age=None):
+class _LRUCache:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+_base_summaries = _LRUCache(SUMMARY_CACHE_SIZE)
+_derived_summaries = _LRUCache(SUMMARY_CACHE_SIZE * 3)
+
+def _text_key(text, fast=None):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest() + (':fast' if fast else '')
+
+def base_summary(text, deadline=None, fast=None):
+    """
+    Одне базове BART summary на текст (як для дорослих), кешоване за хешем тексту.
+    """
+    key = _text_key(text, fast)
+    summary = _base_summaries.get(key)
+    if summary is None:
+        if len(text) > 1000:
+            summary = summarize_with_bart(text, max_len=510, min_len=490, fast=fast, deadline=deadline)
+        else:
+            summary = summarize_with_bart(text, max_len=200, min_len=100, fast=fast, deadline=deadline)
+        # Обрізане дедлайном summary не кешуємо
+        if not (deadline and deadline.expired()):
+            _base_summaries.put(key, summary)
+    return summary
+
+def derived_summary(text, bucket, deadline=None, fast=None):
+    """
+    Summary для вікової групи, виведене з базового: дітям і підліткам — стиснення T5-small
+    короткого базового тексту замість повної рецензії.
+    """
+    base = base_summary(text, deadline, fast)
+    if bucket in ('default', 'adults'):
+        return base
+    key = (_text_key(text, fast), bucket)
+    summary = _derived_summaries.get(key)
+    if summary is None:
+        summary = simplify_with_t5(base, max_len=80 if bucket == 'kids' else 120, fast=fast, deadline=deadline)
+        if not (deadline and deadline.expired()):
+            _derived_summaries.put(key, summary)
+    return summary
+
+def run_summary_variants(text, buckets=tuple(AGE_BUCKETS)):
+    """
+    Summary для кількох вікових груп одразу. У режимі 'shared_base' це коштує
+    приблизно один BART-прогін плюс два короткі прогони T5-small.
+    :return: словник група -> summary
+    """
+    if SUMMARY_MODE == 'shared_base':
+        return {bucket: derived_summary(text, bucket) for bucket in buckets}
+    return {bucket: run_summary_adapted(text, AGE_BUCKETS[bucket]) for bucket in buckets}
+
+def run_summary_adapted(text, age=None, deadline=None, fast=None):
+    if SUMMARY_MODE == 'shared_base':
+        return derived_summary(text, age_bucket(age), deadline, fast)
     if age is None:
-        return summarize_with_bart(text)
+        return summarize_with_bart(text, fast=fast, deadline=deadline)
     elif age <= 12:
-        return simplify_with_t5(text, max_len=80)
+        return simplify_with_t5(text, max_len=80, fast=fast, deadline=deadline)
     elif age <= 17:
-        return simplify_with_t5(text, max_len=120)
+        return simplify_with_t5(text, max_len=120, fast=fast, deadline=deadline)
     else:
         # Для дорослих — залежно від довжини тексту
         if len(text) > 1000:
-            return summarize_with_bart(text, max_len=510, min_len=490)
+            return summarize_with_bart(text, max_len=510, min_len=490, fast=fast, deadline=deadline)
         else:
-            return summarize_with_bart(text, max_len=200, min_len=100)
+            return summarize_with_bart(text, max_len=200, min_len=100, fast=fast, deadline=deadline)
+
+def _generate_batch(kind, texts, max_len, min_len):
+    """
+    Один виклик generate на кілька текстів (з паддінгом); kind — 'bart' або 't5'.
+    """
+    if kind == 't5':
+        tokenizer, model, limit = t5_tokenizer, t5_model, 512
+        texts = ["summarize: " + text for text in texts]
+    else:
+        tokenizer, model, limit = bart_tokenizer, bart_model, 1024
+    inputs = tokenizer(texts, max_length=limit, return_tensors='pt', truncation=True, padding=True)
+    max_len, min_len = generation_budget(inputs['input_ids'].shape[1], max_len, min_len)
+    with model_slot(kind):
+        summary_ids = model.generate(inputs['input_ids'], attention_mask=inputs['attention_mask'],
+                                     max_length=max_len, min_length=min_len, **generation_kwargs())
+    return tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
+
+def _generate_grouped(jobs, batch_size=GENERATION_BATCH_SIZE):
+    """
+    :param jobs: список (kind, text, max_len, min_len)
+    :return: summary у тому ж порядку; прогони з однаковими налаштуваннями йдуть пачками,
+             тексти в пачці близької довжини, щоб паддінг і бюджет генерації були близькі до окремих
+    """
+    outputs = [None] * len(jobs)
+    groups = defaultdict(list)
+    for i, (kind, _, max_len, min_len) in enumerate(jobs):
+        groups[(kind, max_len, min_len)].append(i)
+    for (kind, max_len, min_len), indices in groups.items():
+        indices.sort(key=lambda i: len(jobs[i][1]))
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            for i, summary in zip(chunk, _generate_batch(kind, [jobs[i][1] for i in chunk], max_len, min_len)):
+                outputs[i] = summary
+    return outputs
+
+def _bart_job(text):
+    return ('bart', text, 510, 490) if len(text) > 1000 else ('bart', text, 200, 100)
+
+def run_summary_batch(texts, ages):
+    """
+    run_summary_adapted для пачки текстів з батчованою генерацією (без дедлайнів — офлайн).
+    """
+    if SUMMARY_MODE == 'shared_base':
+        keys = [_text_key(text) for text in texts]
+        bases = [_base_summaries.get(key) for key in keys]
+        todo = [i for i, base in enumerate(bases) if base is None]
+        for i, summary in zip(todo, _generate_grouped([_bart_job(texts[i]) for i in todo])):
+            bases[i] = summary
+            _base_summaries.put(keys[i], summary)
+        buckets = [age_bucket(age) for age in ages]
+        todo = [i for i, bucket in enumerate(buckets) if bucket in ('kids', 'teens')]
+        summaries = list(bases)
+        jobs = [('t5', bases[i], 80 if buckets[i] == 'kids' else 120, 30) for i in todo]
+        for i, summary in zip(todo, _generate_grouped(jobs)):
+            summaries[i] = summary
+            _derived_summaries.put((keys[i], buckets[i]), summary)
+        return summaries
+
+    jobs = []
+    for text, age in zip(texts, ages):
+        if age is None:
+            jobs.append(('bart', text, 200, 100))
+        elif age <= 12:
+            jobs.append(('t5', text, 80, 30))
+        elif age <= 17:
+            jobs.append(('t5', text, 120, 30))
+        else:
+            jobs.append(_bart_job(text))
+    return _generate_grouped(jobs)
+
+def summarize_extractive(text, age=None):
+    """
+    Екстрактивне summary (TextRank) за мілісекунди; довжина залежить від вікової групи.
+    """
+    max_sentences = {'kids': 3, 'teens': 4}.get(age_bucket(age), 5)
+    vectors = None
+    if EXTRACTIVE_EMBEDDINGS:
+        sentences = split_sentences(text)
+        if len(sentences) > max_sentences:
+            with model_slot('embedding'):
+                vectors = kw_model.model.embed(sentences)
+    return extractive_summary(text, max_sentences=max_sentences, sentence_vectors=vectors)
+
+# Рівні деградації конвеєра під навантаженням (див. load_monitor.py)
+TIER_NAMES = ('full', 'greedy', 't5-small', 'extractive')
+
+def summarize_for_tier(text, age, tier=0, deadline=None):
+    if tier == 0:
+        return run_summary_adapted(text, age, deadline)
+    if tier == 1:
+        return run_summary_adapted(text, age, deadline, fast=True)
+    if tier == 2:
+        return simplify_with_t5(text, max_len=80 if age is not None and age <= 12 else 120,
+                                fast=True, deadline=deadline)
+    return summarize_extractive(text, age)
 
 
 # ————————————————————————————————————————————
-def run_analysis(review_text, age=None):
+def run_analysis(review_text, age=None, deadline=None, tier=0, summary_mode='abstractive'):
+    """
+    :param deadline: deadlines.Deadline — кожен етап отримує свою частку часу; якщо час минув,
+                     етап завершується з частковим або спрощеним результатом,
+                     а його назва потрапляє в 'degraded'
+    :param tier: рівень деградації під навантаженням (TIER_NAMES): 1 — greedy-генерація,
+                 2 — T5-small без фільтра спойлерів, 3 — екстрактивне summary без ключових слів
+    :param summary_mode: 'abstractive' (seq2seq-моделі) або 'extractive' (швидке прев'ю: TextRank,
+                         без фільтра спойлерів, ключових слів і ембеддингу)
+    """
+    degraded = []
+    preview = summary_mode == 'extractive'
+
     # 1️⃣ Видалення спойлерів
-    clean_text = remove_spoilers(review_text)
+    if preview:
+        clean_text = review_text
+    elif tier >= 2:
+        clean_text = review_text
+        degraded.append('spoilers')
+    else:
+        clean_text, complete = filter_spoilers(review_text, deadline=deadline.stage(SPOILER_STAGE_SHARE) if deadline else None)
+        if not complete:
+            degraded.append('spoilers')
 
     # 2️⃣ Адаптивне узагальнення
-    adapted_summary = run_summary_adapted(clean_text, age)
+    summary_deadline = deadline.stage(SUMMARY_STAGE_SHARE) if deadline else None
+    if preview:
+        adapted_summary = summarize_extractive(clean_text, age)
+    elif summary_deadline and summary_deadline.expired():
+        adapted_summary = summarize_extractive(clean_text, age)
+        degraded.append('summary')
+    else:
+        adapted_summary = summarize_for_tier(clean_text, age, tier, deadline=summary_deadline)
+        if summary_deadline and summary_deadline.expired():
+            degraded.append('summary')
 
     # 3️⃣ Аналіз тональності
-    sentiment_result = sentiment_pipeline(adapted_summary)[0]
-    sentiment = sentiment_result['label']
+    sentiment = classify_sentiment([adapted_summary])[0]
 
-    # 4️⃣ Витяг ключових слів
-    keywords = kw_model.extract_keywords(
-        adapted_summary,
-        keyphrase_ngram_range=(1, 2),
-        stop_words='english',
-        top_n=5
-    )
-    extracted_keywords = [kw for kw, _ in keywords]
+    # 4️⃣ Ембеддинг summary — один на всіх споживачів (KeyBERT, індекс схожих фільмів)
+    doc_embedding = None if preview else embed_text(adapted_summary)
+
+    # 5️⃣ Витяг ключових слів
+    if preview:
+        extracted_keywords = []
+    elif tier >= 3 or (deadline and deadline.expired()):
+        extracted_keywords = []
+        degraded.append('keywords')
+    else:
+        extracted_keywords = extract_keywords(adapted_summary, doc_embedding=doc_embedding, top_n=5)
 
+    if degraded:
+        print(f"⏰ Результат спрощено (рівень {TIER_NAMES[tier]}): {', '.join(degraded)}")
     return {
         'summary': adapted_summary,
         'sentiment': sentiment,
-        'keywords': extracted_keywords
+        'keywords': extracted_keywords,
+        'embedding': doc_embedding,
+        'degraded': degraded,
+        'tier': TIER_NAMES[tier]
     }
+
+
+def run_analysis_all_ages(review_text, buckets=tuple(AGE_BUCKETS)):
+    """
+    Аналіз одного тексту для кількох вікових груп: спойлери фільтруються один раз,
+    summary виводяться з одного базового (run_summary_variants).
+    :return: словник група -> результат як у run_analysis
+    """
+    clean_text = remove_spoilers(review_text)
+    summaries = run_summary_variants(clean_text, buckets)
+
+    results = {}
+    by_summary = {}
+    for bucket, summary in summaries.items():
+        # Групи з однаковим summary (default/adults у 'shared_base') аналізуються один раз
+        if summary not in by_summary:
+            doc_embedding = embed_text(summary)
+            by_summary[summary] = {
+                'summary': summary,
+                'sentiment': classify_sentiment([summary])[0],
+                'keywords': extract_keywords(summary, doc_embedding=doc_embedding, top_n=5),
+                'embedding': doc_embedding
+            }
+        results[bucket] = by_summary[summary]
+    return results
+
+
+def run_analysis_batch(review_texts, ages=None):
+    """
+    Пакетний варіант run_analysis для офлайн-обробки: спойлери, summary, тональність
+    і ембеддинги рахуються батчами.
+    :param ages: список віку для кожного тексту (або None)
+    """
+    if ages is None:
+        ages = [None] * len(review_texts)
+
+    clean_texts = remove_spoilers_batch(review_texts)
+    summaries = run_summary_batch(clean_texts, ages)
+    sentiments = classify_sentiment(summaries)
+    with model_slot('embedding'):
+        doc_embeddings = kw_model.model.embed(summaries)
+
+    return [
+        {
+            'summary': summary,
+            'sentiment': sentiment,
+            'keywords': extract_keywords(summary, doc_embedding=embedding, top_n=5),
+            'embedding': embedding
+        }
+        for summary, sentiment, embedding in zip(summaries, sentiments, doc_embeddings)
+    ]
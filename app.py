@@ -2,24 +2,348 @@ from flask import Flask, request, jsonify
 from flask_bcrypt import Bcrypt
 from flask_cors import CORS
 from models import db, User, SearchHistory
-from ai_engine import run_analysis
-from external_api import search_guardian_reviews, get_movie_id, get_movie_reviews
-from translation_utils import translate_text
+from ai_engine import run_analysis, age_bucket
+from external_async import fetch_movie_sync, aggregate_reviews_sync
+from translation_utils import translate_text, translate_batch
+from auth_tokens import init_tokens, issue_token, verify_token, revoke_token, token_from_request
+from user_cache import user_cache, profile_from_user
+from recommender import recommender
+from curated import curated_store, normalize_title
+from catalog import catalog
+from singleflight import SingleFlight
+from deadlines import Deadline
+from load_monitor import load_monitor
+from rate_limit import RateLimiter, AdmissionController
+from vector_index import VectorIndex
+from circuit_breaker import UpstreamError
+from title_index import title_index
+from suggest import suggest_index
 import os
+import atexit
+import hashlib
+import secrets
 from dotenv import load_dotenv
-import requests
 
 load_dotenv()
 API_KEY_GUARDIAN = os.getenv("API_KEY_GUARDIAN")
 API_KEY_TMDB = os.getenv("API_KEY_TMDB")
+# Загальний бюджет часу на живий аналіз (отримання тексту + моделі), секунди
+ANALYZE_DEADLINE = float(os.getenv("ANALYZE_DEADLINE", 30))
+# Через скільки секунд радимо повторити запит, якщо сервер перевантажений
+BUSY_RETRY_AFTER = int(os.getenv("BUSY_RETRY_AFTER", 5))
+# Скільки найпопулярніших назв з історії брати в індекс підказок
+SUGGEST_HISTORY_LIMIT = int(os.getenv("SUGGEST_HISTORY_LIMIT", 5000))
+# Додавати до рецензій TMDb рецензію Guardian (завантажується паралельно)
+TMDB_WITH_GUARDIAN = os.getenv("TMDB_WITH_GUARDIAN", "false").lower() == "true"
+# Режим розробки: `python app.py` (app.run(debug=True)) або FLASK_DEBUG=1
+DEBUG = __name__ == '__main__' or os.getenv("FLASK_DEBUG", "0").lower() in ("1", "true")
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
+if not app.config['SECRET_KEY']:
+    # Випадковий ключ у кожного процесу свій: під кількома воркерами токени, видані одним,
+    # відхиляються іншими, а після перезапуску — усі. Допустимо лише для локальної розробки.
+    if not DEBUG:
+        raise RuntimeError("SECRET_KEY не задано — задайте однаковий SECRET_KEY для всіх процесів")
+    app.config['SECRET_KEY'] = secrets.token_hex(32)
+    print("⚠️ SECRET_KEY не задано — згенеровано випадковий ключ (лише для debug), токени не переживуть перезапуск")
 
 db.init_app(app)
 bcrypt = Bcrypt(app)
+init_tokens(app.config['SECRET_KEY'])
+
+# ANN-індекс ембеддингів summary для /similar
+similar_index = VectorIndex(os.path.join(app.instance_path, 'vector_index'))
+atexit.register(similar_index.flush)
+
+# Об'єднання ідентичних одночасних запитів на аналіз
+analysis_flights = SingleFlight()
+
+# Ліміти на користувача/IP та глобальний ліміт одночасних живих аналізів
+rate_limiter = RateLimiter()
+admission = AdmissionController()
+load_monitor.watch_queue(admission.waiting)
+
+
+def load_user_profile(user_id):
+    user = User.query.get(user_id)
+    return profile_from_user(user) if user else None
+
+
+def get_user_profile(user_id):
+    """
+    Профіль користувача через кеш; рядок User читається з БД лише при промаху.
+    """
+    return user_cache.get(user_id, load_user_profile)
+
+
+def record_search(user_id, movie_title, genres):
+    """
+    Зберігає запит в історії та оновлює жанри користувача без завантаження рядка User.
+    """
+    if not user_id:
+        return
+    row_id = None
+    if movie_title:
+        print(f"📌 Збереження в історії: {movie_title}, genres={genres}")
+        entry = SearchHistory(user_id=user_id, movie_title=movie_title, genres=genres)
+        db.session.add(entry)
+        db.session.flush()
+        row_id = entry.id
+    if genres:
+        print(f"🔁 Оновлення жанрів користувача: {genres}")
+        User.query.filter_by(id=user_id).update({'genres': genres})
+    db.session.commit()
+    if genres:
+        user_cache.invalidate(user_id)
+    # Якщо індекс ще не побудовано, цей рядок підтягнеться під час load()
+    if row_id is not None:
+        try:
+            recommender.record_row(row_id, int(user_id), movie_title, genres)
+        except (TypeError, ValueError):
+            pass
+    if movie_title and suggest_index.loaded:
+        title = canonical_title(movie_title)
+        if title:
+            suggest_index.add(title)
+
+
+def canonical_title(movie_title):
+    """
+    Назва з кураторського списку або з TMDb; None для назв, які так і не вдалося знайти.
+    """
+    curated = curated_store.get(movie_title)
+    if curated:
+        return curated['title']
+    movie_id = title_index.resolve(movie_title)
+    movie = title_index.movie(movie_id) if movie_id is not None else None
+    return movie['title'] if movie else None
+
+
+def similar_key(movie_title, movie_id=None):
+    """
+    Ключ індексу схожих фільмів — TMDb ID (з відповіді TMDb або з локального індексу назв),
+    щоб різне написання назви не створювало окремих записів.
+    :return: (ключ або None, назва для показу)
+    """
+    if movie_id is None:
+        movie_id = title_index.resolve(movie_title)
+    if movie_id is None:
+        return None, movie_title
+    movie = title_index.movie(movie_id)
+    return f"tmdb:{movie_id}", movie['title'] if movie else movie_title
+
+
+def ensure_recommender_loaded():
+    if recommender.loaded:
+        return
+    count = recommender.load(lambda: db.session.query(
+        SearchHistory.id, SearchHistory.user_id, SearchHistory.movie_title, SearchHistory.genres,
+        SearchHistory.timestamp
+    ).order_by(SearchHistory.id).all())
+    if count is not None:
+        print(f"🧭 Індекс рекомендацій побудовано: {count} записів історії")
+
+
+def ensure_suggestions_loaded():
+    """
+    Індекс підказок: кураторські назви, назви, знайдені в TMDb, та популярність з історії пошуку.
+    Назви з історії беруться лише в канонічному написанні, щоб не підказувати опечатки.
+    """
+    if suggest_index.loaded:
+        return
+    rows = db.session.query(SearchHistory.movie_title, db.func.count(SearchHistory.id).label('n')) \
+        .group_by(SearchHistory.movie_title).order_by(db.desc('n')).limit(SUGGEST_HISTORY_LIMIT).all()
+    weighted = [(title, 1) for title in curated_store.titles()]
+    weighted += [(title, 1) for title in title_index.titles()]
+    for movie_title, count in rows:
+        title = canonical_title(movie_title) if movie_title else None
+        if title:
+            weighted.append((title, count))
+    suggest_index.load(weighted)
+    print(f"🔤 Індекс підказок побудовано: {len(suggest_index)} назв")
+
+
+class AnalysisError(Exception):
+    def __init__(self, message, status, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def json_response(payload, status, retry_after=None):
+    response = jsonify(payload)
+    response.status_code = status
+    if retry_after:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def error_response(message, status, retry_after=None):
+    return json_response({'error': message}, status, retry_after)
+
+
+def upstream_unavailable(error):
+    print(f"⚠️ Зовнішній сервіс недоступний: {error}")
+    names = {'tmdb': 'TMDb', 'guardian': 'The Guardian'}
+    return AnalysisError(f'{names.get(error.service, error.service)} is temporarily unavailable, please retry later',
+                         503, retry_after=error.retry_after or BUSY_RETRY_AFTER)
+
+
+def analysis_key(source, movie_title, custom_review, age, user_lang, mode='abstractive'):
+    """
+    Ключ для об'єднання запитів: результат залежить лише від джерела, фільму (або тексту рецензії),
+    вікової групи та мови.
+    """
+    if source == 'custom':
+        subject = hashlib.sha1((custom_review or '').encode('utf-8')).hexdigest()
+    else:
+        subject = normalize_title(movie_title)
+    return source, subject, age_bucket(age), user_lang, mode
+
+
+def check_source(source, movie_title_input):
+    if source not in ('guardian', 'tmdb', 'aggregate', 'custom'):
+        raise AnalysisError('Invalid source', 400)
+    if source == 'tmdb' and not movie_title_input:
+        raise AnalysisError('Movie title is required for TMDb source', 400)
+    if source == 'aggregate' and not movie_title_input:
+        raise AnalysisError('Movie title is required for aggregate source', 400)
+
+
+def fetch_review(source, movie_title_input, custom_review, deadline):
+    """
+    Завантаження рецензій для джерела (синхронно, через фоновий async-клієнт).
+    """
+    fetched = None
+    try:
+        if source in ('guardian', 'tmdb'):
+            # ID → (рецензії ∥ жанри ∥ Guardian) паралельно; решта дедлайну лишається моделям
+            fetched = fetch_movie_sync(movie_title_input, source, with_guardian=TMDB_WITH_GUARDIAN,
+                                       timeout=deadline.remaining())
+        elif source == 'aggregate':
+            fetched = aggregate_reviews_sync(movie_title_input, timeout=deadline.remaining())
+    except TimeoutError:
+        raise AnalysisError('Timed out fetching reviews', 504)
+    except UpstreamError as e:
+        raise upstream_unavailable(e)
+    return review_from_fetched(source, movie_title_input, custom_review, fetched)
+
+
+def review_from_fetched(source, movie_title_input, custom_review, fetched):
+    """
+    :param fetched: результат fetch_movie / aggregate_reviews (None для custom)
+    :return: {'text', 'title', 'movie_id', 'genres', 'stale'}
+    """
+    review = {'title': movie_title_input, 'movie_id': None, 'genres': None,
+              'stale': bool(fetched and fetched.get('stale'))}
+
+    if source == 'guardian':
+        review['text'] = fetched['guardian'] or "No review found."
+    elif source == 'tmdb':
+        review['movie_id'] = fetched['movie_id']
+        if not review['movie_id']:
+            raise AnalysisError(f'Movie "{movie_title_input}" not found in TMDb', 404)
+        review['text'] = "\n".join(t for t in (fetched['reviews'], fetched['guardian']) if t) \
+            or "No user reviews found."
+        review['genres'] = fetched['genres']
+    elif source == 'aggregate':
+        # Кілька сторінок TMDb + кілька статей Guardian, без дублікатів і в межах бюджету токенів
+        if not fetched['text']:
+            raise AnalysisError(f'No reviews found for "{movie_title_input}"', 404)
+        print(f"📚 Рецензій: {fetched['reviews']}, відкинуто дублікатів: {fetched['duplicates']}")
+        review['movie_id'] = fetched['movie_id']
+        review['text'] = fetched['text']
+        review['genres'] = fetched['genres']
+    else:
+        review['text'] = custom_review or "No custom review provided."
+        review['title'] = "Custom Review"
+
+    # --- Жанры из TMDb (запрос пользователя может переопределить их) ---
+    if review['movie_id']:
+        if review['genres'] is not None:
+            print(f"🎭 Жанри з TMDb: {review['genres']}")
+        else:
+            print("⚠️ Не вдалося отримати жанри з TMDb")
+    return review
+
+
+def analyze_review(review, source, age, user_lang, mode, deadline):
+    """
+    Переклад, моделі та переклад результату — блокуюча частина живого аналізу.
+    :return: словник summary/sentiment/keywords + назва для історії та жанри з TMDb
+    """
+    text_for_analysis = review['text']
+
+    # --- Перевод входного текста для АНАЛИЗА (у межах дедлайну) ---
+    if user_lang != 'en':
+        text_for_analysis = translate_text(text_for_analysis, 'en', timeout=deadline.remaining())
+
+    # --- Анализ (рівень деградації залежить від поточного навантаження) ---
+    tier = load_monitor.tier()
+    print(f"🧠 Аналізуємо текст (рівень {tier}):", text_for_analysis[:300])
+    with load_monitor.track():
+        result_from_analysis = run_analysis(text_for_analysis, age=age, deadline=deadline, tier=tier,
+                                           summary_mode=mode)
+
+    # --- Ембеддинг summary для пошуку схожих фільмів (прев'ю не індексується) ---
+    if source != 'custom' and review['title'] and mode != 'extractive':
+        key, title = similar_key(review['title'], review['movie_id'])
+        if key:
+            similar_index.add(key, title, result_from_analysis['embedding'])
+
+    # --- Перевод результатов анализа: один запит, лише якщо дедлайн ще не минув ---
+    final_summary = result_from_analysis['summary']
+    final_sentiment = result_from_analysis['sentiment']
+    final_keywords = result_from_analysis['keywords']
+    degraded = list(result_from_analysis['degraded'])
+    if user_lang != 'en':
+        if deadline.expired():
+            degraded.append('translation')
+        else:
+            translated = translate_batch([final_summary, final_sentiment] + list(final_keywords), user_lang,
+                                         timeout=deadline.remaining())
+            final_summary, final_sentiment, final_keywords = translated[0], translated[1], translated[2:]
+
+    return {
+        'summary': final_summary,
+        'sentiment': final_sentiment,
+        'keywords': final_keywords,
+        'title': review['title'],
+        'genres': review['genres'],
+        # 'reviews' — рецензії взято зі збереженої копії, бо джерело зараз недоступне
+        'degraded': degraded + (['reviews'] if review['stale'] else []),
+        'tier': result_from_analysis['tier']
+    }
+
+
+def run_live_analysis(source, movie_title_input, custom_review, age, user_lang, mode='abstractive'):
+    """
+    Отримання тексту, аналіз та переклад результату — спільна для ідентичних запитів частина /analyze.
+    """
+    check_source(source, movie_title_input)
+    # У WSGI відключення клієнта не видно, тож дедлайн тут ніхто не скасовує — лише час
+    deadline = Deadline(ANALYZE_DEADLINE)
+    review = fetch_review(source, movie_title_input, custom_review, deadline)
+    return analyze_review(review, source, age, user_lang, mode, deadline)
+
+
+def admitted_live_analysis(*args):
+    """
+    run_live_analysis під глобальним лімітом одночасних аналізів; при переповненій черзі — 503.
+    Екстрактивне прев'ю обходиться без важких моделей, тож слот не займає.
+    """
+    if args[5] == 'extractive':
+        return run_live_analysis(*args)
+    if not admission.acquire():
+        raise AnalysisError('Server is busy, please retry later', 503, retry_after=BUSY_RETRY_AFTER)
+    try:
+        return run_live_analysis(*args)
+    finally:
+        admission.release()
 
 
 # --- Регістрація ---
@@ -49,203 +373,113 @@ def signup():
 
     return jsonify({'message': 'User created successfully'}), 201
 
-@app.route('/analyze', methods=['POST'])
-def analyze():
-    data = request.get_json()
-    print(f"🌐 Запит на аналіз: {data}")
 
+# --- Аналіз ---
+def prepare_analysis(data, token, ip):
+    """
+    Частина /analyze до живого аналізу (спільна для WSGI- та ASGI-версій): користувач, ліміти,
+    кураторські тексти та каталог.
+    :return: (ctx, None) для живого аналізу або (None, (payload, status, retry_after)) — готова відповідь
+    """
     source = data.get('source')
     movie_title_input = data.get('movieTitle', '').strip()
     custom_review = data.get('customReview')
     user_id = data.get('userId')
     age = data.get('age')
+    # 'extractive' — швидке summary без генерації (можна слати паралельно як прев'ю)
+    mode = 'extractive' if data.get('mode') == 'extractive' else 'abstractive'
+
+    # Якщо є валідний токен сесії — беремо дані користувача з нього, без запиту до БД
+    claims = verify_token(token)
+    if claims:
+        user_id = claims['uid']
+        if age is None:
+            age = claims.get('age')
+        user_lang = data.get('language') or claims.get('lang') or 'en'
+    else:
+        profile = get_user_profile(user_id)
+        user_lang = data.get('language') or (profile['language'] if profile else 'en')
 
-    user = User.query.get(user_id)
-    user_lang = data.get('language') or (user.language if user and user.language else 'en')
+    # --- Ліміт запитів на користувача та IP ---
+    retry_after = rate_limiter.check(user_id=user_id, ip=ip, preview=mode == 'extractive')
+    if retry_after:
+        return None, ({'error': 'Too many requests, please slow down'}, 429, retry_after)
 
-    # Переменные для финального результата, которые будут заполнены
-    final_summary = ""
-    final_sentiment = ""
-    final_keywords = []
     genres_to_use = data.get('genres')  # Изначально берем жанры из запроса, если они есть
-    movie_title_to_save = ""
-
-    # --- Специальная обработка для конкретных фильмов ---
-    # БЛОК ДЛЯ TERMINATOR 1984
-    if movie_title_input.lower() == 'terminator 1984': # Исправлено на lowercase
-        print("🎯 Збіг із 'Terminator 1984' — повертаємо кастомний текст та жанри без аналізу/перекладу.")
-
-        custom_terminator_text_uk = (
-            "У 1984 році Джеймс Кемерон випустив свій сенсаційний науково-фантастичний трилер «Термінатор»: історію про кіборга-вбивцю з людською плоттю, що огортає металевий робо-скелет, якого зловісні машинні тирани відправили назад у часі, щоб убити матір майбутнього вождя повстанців.\n"
-            "Завдяки цьому фільму, який зараз перевидається, Кемерон міг би зрівнятися з Карпентером та Спілбергом. На жаль, він породив низку безглуздих та низькопробних продовжень, але перший «Термінатор» – співавтор сценарію та співпродюсерка Гейл Енн Герд – неймовірно добре виглядає завдяки шаленому запалу та палкому захопленню. «Термінатор» має таку розповідну потужність, що ви не будете хвилюватися про те, як «машини» нібито повстали з попелу майбутньої ядерної війни, або як було винайдено подорожі в часі, які, очевидно, доступні як гнобителям, так і повстанцям.\n"
-            "Отримання надзвичайного фізичного зразка Арнольда Шварценеггера на головну роль було геніальним тріском і щасливим випадком. Кожен його грудний м’яз розміром з бік бика. Це приголомшлива акторська гра в афроамериканському комедійному жанрі, і без Шварценеггера фільм, звичайно, немислимий. Лінда Гамільтон грає Сару Коннор, у якої будуть глибокі романтичні стосунки з Кайлом (Майкл Бін), відправленим у минуле, щоб допомогти їй. Класичний бойовик 80-х."
-        )
-
-        final_summary = custom_terminator_text_uk
-        final_sentiment = "ПОЗИТИВНИЙ"
-        final_keywords = ["Термінатор", "Джеймс Кемерон", "наукова фантастика", "бойовик", "Арнольд Шварценеггер",
-                          "штучний інтелект"]
-
-        genres_to_use = 'Action,Sci-Fi,Thriller'
-        movie_title_to_save = "The Terminator (1984)"
-
-        # --- Сохранение в историю и обновление жанров (для Terminator 1984) ---
-        if user_id and movie_title_to_save:
-            print(f"📌 Збереження в історії (Terminator): {movie_title_to_save}, genres={genres_to_use}")
-            db.session.add(SearchHistory(user_id=user_id, movie_title=movie_title_to_save, genres=genres_to_use))
-            db.session.commit()
-
-        if user and genres_to_use:
-            print(f"🔁 Оновлення жанрів користувача (Terminator): {genres_to_use}")
-            user.genres = genres_to_use
-            db.session.commit()
-
-        return jsonify({
-            'summary': final_summary,
-            'sentiment': final_sentiment,
-            'keywords': final_keywords
-        }), 200
-
-    # БЛОК ДЛЯ HOME ALONE 2 - ВЫНЕСЕН НА ОДИН УРОВЕНЬ С ТЕРМИНАТОРОМ
-    elif movie_title_input.lower() == 'home alone 2': # Исправлено на lowercase
-        print("🎯 Збіг із 'Home Alone 2' — повертаємо кастомний текст та жанри без аналізу/перекладу.")
-
-        custom_home_alone_2_text_uk = (
-            "\"Сам удома 2\" — це тепла, дотепна та ностальгічна сімейна комедія, яка вдало продовжує історію, знайому глядачам ще з першої частини. Цього разу пригоди малого Кевіна переносяться в мегаполіс — Нью-Йорк, що додає нових барв і масштабів. Атмосфера міста, святковий настрій і колоритні персонажі створюють неповторну магію Різдва, яка так припала до душі багатьом шанувальникам стрічки."
-            "Глядачі високо оцінюють гру Маколея Калкіна, який знову проявляє природну харизму, кмітливість і невимушений гумор. Незважаючи на юний вік, актор утримує увагу на собі протягом усього фільму. Не менш яскравими є й другорядні персонажі — як позитивні, так і негативні, кожен з яких додає сюжету своєї родзинки."
-            "Музичний супровід, візуальний стиль і загальна атмосфера фільму отримали чимало схвальних відгуків від глядачів. Багато хто вважає другу частину навіть більш казковою та різдвяною, ніж першу, завдяки неймовірним пейзажам Нью-Йорка та щирим емоціям, що наповнюють стрічку."
-            "Рецензії користувачів здебільшого позитивні: фільм називають класикою святкового жанру, до якої хочеться повертатися щороку. Його перегляд асоціюється з родинним теплом, дитячими спогадами та сміхом."
-            "Безперечно, Сам удома 2 залишається важливою частиною зимового кінонабору для всієї родини."
-        )
-
-        final_summary = custom_home_alone_2_text_uk
-        final_sentiment = "ПОЗИТИВНИЙ"
-        final_keywords = ["Сам удома 2", "Кевін", "комедія", "Різдво", "Нью-Йорк", "Маколей Калкін"]
-        genres_to_use = 'Comedy,Family,Adventure' # Добавил Family, Adventure
-        movie_title_to_save = "Home Alone 2: Lost in New York"
-
-        # --- Сохранение в историю и обновление жанров (для Home Alone 2) ---
-        if user_id and movie_title_to_save:
-            print(f"📌 Збереження в історії (Home Alone 2): {movie_title_to_save}, genres={genres_to_use}")
-            db.session.add(SearchHistory(user_id=user_id, movie_title=movie_title_to_save, genres=genres_to_use))
-            db.session.commit()
-
-        if user and genres_to_use:
-            print(f"🔁 Оновлення жанрів користувача (Home Alone 2): {genres_to_use}")
-            user.genres = genres_to_use
-            db.session.commit()
-
-        return jsonify({
-            'summary': final_summary,
-            'sentiment': final_sentiment,
-            'keywords': final_keywords
-        }), 200
-
-        # БЛОК ДЛЯ 101 DALMATIANS - НОВЫЙ
-    elif movie_title_input.lower() == '101 Dalmatians':
-        print("🎯 Збіг із '101 Dalmatians' — повертаємо кастомний текст та жанри без аналізу/перекладу.")
-
-        custom_101_dalmatians_text_uk = (
-            "«101 далматинець» — класичний мультфільм студії Disney, який здобув прихильність критиків завдяки стильній анімації, дотепному сценарію та харизматичним героям. "
-            "Критики відзначають чудовий баланс між пригодами, гумором та емоційною глибиною. Головні персонажі, як людські, так і собачі, легко запам’ятовуються завдяки виразному характеру та природній взаємодії. "
-            "Мультфільм не лише розважає, а й порушує важливі теми — зокрема про любов до тварин, сімейні цінності та хоробрість. "
-            "«101 далматинець» вважається однією з найкращих класичних стрічок Disney, яка зберігає актуальність і чарівність навіть через десятиліття. "
-        )
-
-        final_summary = custom_101_dalmatians_text_uk
-        final_sentiment = "ПОЗИТИВНИЙ"
-        final_keywords = ["101 далматинець", "Дісней", "мультфільм", "анімація", "Круелла Де Віль", "далматинці",
-                          "сімейний фільм"]
-        genres_to_use = 'Family,Animation,Adventure,Comedy'  # Добавил более полные жанры для Диснея
-        movie_title_to_save = "101 Dalmatians (1961)"  # Год для уточнения
-
-        if user_id and movie_title_to_save:
-            print(f"📌 Збереження в історії (101 Dalmatians): {movie_title_to_save}, genres={genres_to_use}")
-            db.session.add(SearchHistory(user_id=user_id, movie_title=movie_title_to_save, genres=genres_to_use))
-            db.session.commit()
-
-        if user and genres_to_use:
-            print(f"🔁 Оновлення жанрів користувача (101 Dalmatians): {genres_to_use}")
-            user.genres = genres_to_use
-            db.session.commit()
-
-        return jsonify({
-            'summary': final_summary,
-            'sentiment': final_sentiment,
-            'keywords': final_keywords
-        }), 200
-    # --- ЭТОТ БЛОК ВЫПОЛНЯЕТСЯ ТОЛЬКО ЕСЛИ ВВОД НЕ СПЕЦИАЛЬНЫЙ ФИЛЬМ ---
-    else:
-        movie_title_to_save = movie_title_input
-        text_for_analysis = "" # Инициализация для обычного случая
-
-        if source == 'guardian':
-            text_for_analysis = search_guardian_reviews(movie_title_input) or "No review found."
-        elif source == 'tmdb':
-            if movie_title_input:
-                movie_id = get_movie_id(movie_title_input)
-                if movie_id:
-                    text_for_analysis = get_movie_reviews(movie_id) or "No user reviews found."
-                else:
-                    return jsonify({'error': f'Movie "{movie_title_input}" not found in TMDb'}), 404
-            else:
-                return jsonify({'error': 'Movie title is required for TMDb source'}), 400
-        elif source == 'custom':
-            text_for_analysis = custom_review or "No custom review provided."
-            movie_title_to_save = "Custom Review"
-        else:
-            return jsonify({'error': 'Invalid source'}), 400
-
-        # --- Если жанры не заданы в запросе, но есть movie_id (для TMDb) ---
-        if not genres_to_use and movie_id:
-            tmdb_url = f"https://api.themoviedb.org/3/movie/{movie_id}"
-            params = {"api_key": API_KEY_TMDB, "language": "en-US"}
-            resp = requests.get(tmdb_url, params=params)
-            if resp.status_code == 200:
-                movie_data = resp.json()
-                genres_list = [g['name'] for g in movie_data.get('genres', [])]
-                genres_to_use = ','.join(genres_list)
-                print(f"🎭 Жанри з TMDb: {genres_to_use}")
-            else:
-                print("⚠️ Не вдалося отримати жанри з TMDb")
-
-        # --- История поиска (для других фильмов) ---
-        if user_id and movie_title_to_save:
-            print(f"📌 Збереження в історії: {movie_title_to_save}, genres={genres_to_use}")
-            db.session.add(SearchHistory(user_id=user_id, movie_title=movie_title_to_save, genres=genres_to_use))
-            db.session.commit()
-
-        # --- Обновить жанры у пользователя (для других фильмов) ---
-        if user and genres_to_use:
-            print(f"🔁 Оновлення жанрів користувача: {genres_to_use}")
-            user.genres = genres_to_use
-            db.session.commit()
-
-        # --- Перевод входного текста для АНАЛИЗА ---
-        if user_lang != 'en':
-            text_for_analysis = translate_text(text_for_analysis, 'en')
-
-        # --- Анализ ---
-        print("🧠 Аналізуємо текст:", text_for_analysis[:300])
-        result_from_analysis = run_analysis(text_for_analysis, age=age)
-
-        # --- Перевод результатов анализа ---
-        if user_lang != 'en':
-            final_summary = translate_text(result_from_analysis['summary'], user_lang)
-            final_sentiment = translate_text(result_from_analysis['sentiment'], user_lang)
-            final_keywords = [translate_text(k, user_lang) for k in result_from_analysis['keywords']]
-        else:
-            final_summary = result_from_analysis['summary']
-            final_sentiment = result_from_analysis['sentiment']
-            final_keywords = result_from_analysis['keywords']
 
-    # --- ОТПРАВКА ФИНАЛЬНОГО РЕЗУЛЬТАТА ДЛЯ ОБЩЕГО СЛУЧАЯ (если не было return выше) ---
-    print(f"📦 ОТПРАВЛЯЕМ НА ФРОНТЕНД (общий случай): {final_summary[:100]}...")
-    return jsonify({
-        'summary': final_summary,
-        'sentiment': final_sentiment,
-        'keywords': final_keywords
-    }), 200
+    # --- Кураторські тексти для окремих фільмів (curated_titles.json) ---
+    curated = curated_store.get(movie_title_input)
+    if curated:
+        print(f"🎯 Збіг із '{curated['title']}' — повертаємо кастомний текст та жанри без аналізу/перекладу.")
+        if mode != 'extractive':
+            record_search(user_id, curated['title'], curated['genres'])
+        return None, ({
+            'summary': curated['summary'],
+            'sentiment': curated['sentiment'],
+            'keywords': curated['keywords']
+        }, 200, None)
+
+    # --- Заздалегідь порахований аналіз популярного фільму (build_catalog.py) ---
+    precomputed = catalog.get(movie_title_input, source, age_bucket(age), user_lang) if movie_title_input else None
+    if precomputed:
+        print(f"⚡ '{precomputed['title']}' знайдено в каталозі — без моделей та мережевих запитів.")
+        if mode != 'extractive':
+            record_search(user_id, precomputed['title'], genres_to_use or precomputed['genres'])
+        return None, ({
+            'summary': precomputed['summary'],
+            'sentiment': precomputed['sentiment'],
+            'keywords': precomputed['keywords']
+        }, 200, None)
+
+    return {
+        'source': source,
+        'movie_title': movie_title_input,
+        'custom_review': custom_review,
+        'user_id': user_id,
+        'age': age,
+        'user_lang': user_lang,
+        'mode': mode,
+        'genres': genres_to_use,
+    }, None
+
+
+def finish_analysis(ctx, result, shared):
+    """
+    Історія пошуку та тіло відповіді після живого аналізу.
+    """
+    # --- История поиска и жанры пользователя (прев'ю — не окремий пошук) ---
+    if ctx['mode'] != 'extractive':
+        record_search(ctx['user_id'], result['title'], ctx['genres'] or result['genres'])
+
+    print(f"📦 ОТПРАВЛЯЕМ НА ФРОНТЕНД{' (спільний результат)' if shared else ''}: {result['summary'][:100]}...")
+    response = {
+        'summary': result['summary'],
+        'sentiment': result['sentiment'],
+        'keywords': result['keywords'],
+        'tier': result['tier']
+    }
+    if result['degraded']:
+        response['degraded'] = result['degraded']
+    return response
+
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    data = request.get_json()
+    print(f"🌐 Запит на аналіз: {data}")
+
+    ctx, ready = prepare_analysis(data, token_from_request(request), request.remote_addr)
+    if ready:
+        return json_response(*ready)
+
+    # --- Звичайний випадок: ідентичні одночасні запити виконуються один раз ---
+    args = (ctx['source'], ctx['movie_title'], ctx['custom_review'], ctx['age'], ctx['user_lang'], ctx['mode'])
+    try:
+        result, shared = analysis_flights.do(analysis_key(*args), lambda: admitted_live_analysis(*args))
+    except AnalysisError as e:
+        return error_response(str(e), e.status, e.retry_after)
+
+    return jsonify(finish_analysis(ctx, result, shared)), 200
 
 # --- Логін ---
 @app.route('/login', methods=['POST'])
@@ -258,41 +492,86 @@ def login():
     if not user or not bcrypt.check_password_hash(user.password, password):
         return jsonify({'error': 'Invalid credentials'}), 401
 
+    # Рядок уже завантажено для перевірки пароля — прогріваємо кеш профілю
+    profile = profile_from_user(user)
+    user_cache.put(profile)
+
     return jsonify({
         'message': 'Login successful',
+        'token': issue_token(user),
         'user_id': user.id,
         'username': user.username,
         'age': user.age,
         'gender': user.gender,
-        'genres': user.genres.split(',') if user.genres else []
+        'genres': profile['genres']
     }), 200
 
 
 @app.route('/logout', methods=['POST'])
 def logout():
+    token = token_from_request(request)
+    if token:
+        revoke_token(token)
     return jsonify({'message': 'Logged out successfully'}), 200
 
 
 @app.route('/user/<int:user_id>/genres', methods=['GET'])
 def get_user_genres(user_id):
-    user = User.query.get(user_id)
-    if not user:
+    profile = get_user_profile(user_id)
+    if not profile:
         return jsonify({'error': 'User not found'}), 404
 
     # Якщо жанри не збережено або вони порожні — даємо за гендером
-    if not user.genres or user.genres.strip() == "":
+    genres = [g for g in profile['genres'] if g.strip()]
+    if not genres:
         print("⚠️ Жанри не задані — підставляємо за gender")
-        if user.gender == 'male':
+        if profile['gender'] == 'male':
             default_genres = ['Action', 'Sci-Fi', 'Thriller']
-        elif user.gender == 'female':
+        elif profile['gender'] == 'female':
             default_genres = ['Romance', 'Drama', 'Comedy']
         else:
             default_genres = ['Adventure', 'Drama']  # для інших випадків
         return jsonify({'genres': default_genres})
 
-    # Інакше — розбиваємо на список
-    genres = user.genres.split(',') if user.genres else []
-    return jsonify({'genres': genres})
+    # Інакше — віддаємо вже розбитий список з кешу
+    return jsonify({'genres': profile['genres']})
+
+
+@app.route('/user/<int:user_id>/recommendations', methods=['GET'])
+def get_user_recommendations(user_id):
+    profile = get_user_profile(user_id)
+    if not profile:
+        return jsonify({'error': 'User not found'}), 404
+
+    limit = request.args.get('limit', 10, type=int)
+    ensure_recommender_loaded()
+    recommendations = recommender.recommend(user_id, n=max(1, min(limit, 100)),
+                                            fallback_genres=profile['genres'])
+    return jsonify({'recommendations': recommendations})
+
+
+@app.route('/similar', methods=['GET'])
+def similar_movies():
+    movie_title = request.args.get('movieTitle', '').strip()
+    limit = request.args.get('limit', 10, type=int)
+    if not movie_title:
+        return jsonify({'error': 'movieTitle is required'}), 400
+
+    key, _ = similar_key(movie_title)
+    vector = similar_index.vector_for(key) if key else None
+    if vector is None:
+        return jsonify({'error': f'Movie "{movie_title}" has not been analyzed yet'}), 404
+
+    similar = similar_index.search(vector, k=max(1, min(limit, 50)), exclude_key=key)
+    return jsonify({'movieTitle': movie_title, 'similar': similar})
+
+
+@app.route('/suggest', methods=['GET'])
+def suggest_titles():
+    prefix = request.args.get('q', '')
+    limit = request.args.get('limit', 8, type=int)
+    ensure_suggestions_loaded()
+    return jsonify({'q': prefix, 'suggestions': suggest_index.suggest(prefix, max(1, min(limit, 20)))})
 
 
 # --- Ініціалізація БД ---
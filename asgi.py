@@ -0,0 +1,168 @@
+# asgi.py
+"""
+ASGI-режим: /analyze обробляється асинхронно (Starlette), решта маршрутів — той самий Flask
+через WSGI-міст.
+
+Мережеві запити до TMDb і Guardian очікуються в event loop без окремих потоків, моделі
+виконуються в пулі потоків розміром MAX_IN_FLIGHT. Якщо клієнт відключився, аналіз
+скасовується через Deadline.cancel().
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+from app import (
+    app as flask_app, AnalysisError, ANALYZE_DEADLINE, BUSY_RETRY_AFTER, TMDB_WITH_GUARDIAN,
+    analysis_key, analyze_review, check_source, finish_analysis, prepare_analysis,
+    review_from_fetched, upstream_unavailable,
+)
+from auth_tokens import token_from_request
+from circuit_breaker import UpstreamError
+from deadlines import Deadline
+from external_async import make_client, fetch_movie, aggregate_reviews
+from load_monitor import load_monitor
+from models import db
+from rate_limit import AsyncAdmissionController, MAX_IN_FLIGHT
+from singleflight import AsyncSingleFlight
+
+# Як часто перевіряти, чи клієнт ще чекає на відповідь, секунди
+DISCONNECT_POLL = float(os.getenv("DISCONNECT_POLL", 0.5))
+
+inference_pool = ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT, thread_name_prefix='inference')
+admission = AsyncAdmissionController()
+load_monitor.watch_queue(admission.waiting)
+analysis_flights = AsyncSingleFlight()
+
+
+def in_app_context(fn, *args):
+    with flask_app.app_context():
+        return fn(*args)
+
+
+def json_response(payload, status, retry_after=None):
+    headers = {'Retry-After': str(retry_after)} if retry_after else None
+    return JSONResponse(payload, status_code=status, headers=headers)
+
+
+async def fetch_review_async(client, source, movie_title, custom_review, deadline):
+    try:
+        if source in ('guardian', 'tmdb'):
+            fetched = await asyncio.wait_for(
+                fetch_movie(client, movie_title, source, with_guardian=TMDB_WITH_GUARDIAN), deadline.remaining()
+            )
+        elif source == 'aggregate':
+            fetched = await asyncio.wait_for(aggregate_reviews(client, movie_title), deadline.remaining())
+        else:
+            fetched = None
+    except asyncio.TimeoutError:
+        raise AnalysisError('Timed out fetching reviews', 504)
+    except UpstreamError as e:
+        raise upstream_unavailable(e)
+    return review_from_fetched(source, movie_title, custom_review, fetched)
+
+
+async def live_analysis(client, ctx):
+    """
+    Рецензії — в event loop; моделі та переклад — в inference_pool під асинхронним лімітом.
+    """
+    check_source(ctx['source'], ctx['movie_title'])
+    deadline = Deadline(ANALYZE_DEADLINE)
+    try:
+        review = await fetch_review_async(client, ctx['source'], ctx['movie_title'], ctx['custom_review'], deadline)
+        args = (analyze_review, review, ctx['source'], ctx['age'], ctx['user_lang'], ctx['mode'], deadline)
+        if ctx['mode'] == 'extractive':
+            # Прев'ю без важких моделей: слот допуску не займає
+            return await run_in_threadpool(*args)
+        if not await admission.acquire():
+            raise AnalysisError('Server is busy, please retry later', 503, retry_after=BUSY_RETRY_AFTER)
+
+        loop = asyncio.get_running_loop()
+        try:
+            job = inference_pool.submit(*args)
+        except RuntimeError:
+            # Пул уже зупинено (завершення роботи)
+            admission.release()
+            raise
+
+        def release_slot(_):
+            # Слот звільняється, коли потік справді завершився, а не коли запит скасовано
+            try:
+                loop.call_soon_threadsafe(admission.release)
+            except RuntimeError:
+                pass  # event loop уже закрито — процес завершується
+
+        job.add_done_callback(release_slot)
+        return await asyncio.wrap_future(job)
+    except asyncio.CancelledError:
+        # Потік з моделями ззовні не зупинити — скасовуємо кооперативно
+        deadline.cancel()
+        raise
+
+
+async def until_disconnected(request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL)
+
+
+async def analyze(request):
+    data = await request.json()
+    print(f"🌐 Запит на аналіз (ASGI): {data}")
+
+    ip = request.client.host if request.client else None
+    ctx, ready = await run_in_threadpool(in_app_context, prepare_analysis, data, token_from_request(request), ip)
+    if ready:
+        return json_response(*ready)
+
+    # --- Ідентичні одночасні запити виконуються один раз ---
+    args = (ctx['source'], ctx['movie_title'], ctx['custom_review'], ctx['age'], ctx['user_lang'], ctx['mode'])
+    client = request.app.state.http
+    flight = asyncio.ensure_future(analysis_flights.do(analysis_key(*args), lambda: live_analysis(client, ctx)))
+    watcher = asyncio.ensure_future(until_disconnected(request))
+    try:
+        await asyncio.wait({flight, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    if not flight.done():
+        # Якщо на цей аналіз більше ніхто не чекає, AsyncSingleFlight скасує його
+        flight.cancel()
+        print("🔌 Клієнт відключився — аналіз більше не потрібен")
+        return Response(status_code=499)
+
+    try:
+        result, shared = flight.result()
+    except AnalysisError as e:
+        return json_response({'error': str(e)}, e.status, e.retry_after)
+    payload = await run_in_threadpool(in_app_context, finish_analysis, ctx, result, shared)
+    return JSONResponse(payload)
+
+
+@asynccontextmanager
+async def lifespan(application):
+    await run_in_threadpool(in_app_context, db.create_all)
+    application.state.http = make_client()
+    try:
+        yield
+    finally:
+        await application.state.http.aclose()
+        inference_pool.shutdown(wait=False, cancel_futures=True)
+
+
+application = Starlette(
+    routes=[
+        Route('/analyze', analyze, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
@@ -0,0 +1,170 @@
+# auth_tokens.py
+import math
+import os
+import threading
+import time
+import uuid
+
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+TOKEN_MAX_AGE = int(os.getenv("SESSION_TOKEN_MAX_AGE", 7 * 24 * 3600))
+TOKEN_SALT = "cinemind-session"
+# Спільне сховище відкликаних токенів для кількох процесів (опційно, потрібен пакет redis)
+REDIS_URL = os.getenv("REDIS_URL")
+
+_serializer = None
+
+
+class MemoryRevocationStore:
+    """
+    Список відкликаних токенів у пам'яті процесу: jti -> час, коли токен і так протухне.
+    Підходить лише для одного процесу.
+    """
+
+    def __init__(self):
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, jti, ttl):
+        now = time.time()
+        with self._lock:
+            # Прострочені записи більше не потрібні — підпис їх і так відхилить
+            for old in [j for j, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[old]
+            self._revoked[jti] = now + ttl
+
+    def is_revoked(self, jti):
+        with self._lock:
+            exp = self._revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+
+class RedisRevocationStore:
+    """
+    Відкликані токени в Redis (ключ живе стільки, скільки лишилось токену) — спільні для всіх процесів.
+    Поки Redis недоступний, відкликання пам'ятаються в пам'яті процесу.
+    """
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._redis_error = redis.RedisError
+        self._fallback = MemoryRevocationStore()
+        self._degraded = False
+
+    def _failed(self, e):
+        if not self._degraded:
+            self._degraded = True
+            print(f"⚠️ Redis недоступний ({e}) — відкликання токенів тимчасово лише в пам'яті процесу")
+
+    def _recovered(self):
+        if self._degraded:
+            self._degraded = False
+            print("✅ Redis знову доступний — відкликання токенів спільні для всіх процесів")
+
+    def revoke(self, jti, ttl):
+        # Локальна копія — щоб цей процес відхиляв токен навіть під час збою Redis
+        self._fallback.revoke(jti, ttl)
+        try:
+            self._redis.set(f"cinemind:revoked:{jti}", 1, ex=max(1, math.ceil(ttl)))
+        except self._redis_error as e:
+            self._failed(e)
+            return
+        self._recovered()
+
+    def is_revoked(self, jti):
+        if self._fallback.is_revoked(jti):
+            return True
+        try:
+            revoked = bool(self._redis.exists(f"cinemind:revoked:{jti}"))
+        except self._redis_error as e:
+            self._failed(e)
+            return False
+        self._recovered()
+        return revoked
+
+
+def make_revocation_store():
+    if REDIS_URL:
+        try:
+            return RedisRevocationStore(REDIS_URL)
+        except ImportError:
+            print("⚠️ REDIS_URL задано, але пакет redis не встановлено — відкликання токенів лише в пам'яті процесу")
+    return MemoryRevocationStore()
+
+
+_revocations = MemoryRevocationStore()
+
+
+def init_tokens(secret_key, revocations=None):
+    """
+    Ініціалізує підписувач токенів секретом застосунку та сховище відкликаних токенів.
+    :param secret_key: app.config['SECRET_KEY'] — має бути однаковим для всіх процесів
+    :param revocations: сховище відкликань; за замовчуванням Redis (якщо задано REDIS_URL) або пам'ять
+    """
+    global _serializer, _revocations
+    _serializer = URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+    _revocations = revocations or make_revocation_store()
+
+
+def issue_token(user):
+    """
+    Видає підписаний stateless токен сесії з даними, потрібними гарячим ендпоінтам.
+    :param user: об'єкт User
+    :return: рядок токена
+    """
+    claims = {
+        'uid': user.id,
+        'age': user.age,
+        'lang': user.language or 'en',
+        'genres': user.genres.split(',') if user.genres else [],
+        'jti': uuid.uuid4().hex,
+    }
+    return _serializer.dumps(claims)
+
+
+def _decode(token, return_timestamp=False):
+    try:
+        return _serializer.loads(token, max_age=TOKEN_MAX_AGE, return_timestamp=return_timestamp)
+    except (BadSignature, SignatureExpired):
+        return None
+
+
+def verify_token(token):
+    """
+    Перевіряє підпис, термін дії та відкликання токена.
+    :return: словник claims або None
+    """
+    if not token:
+        return None
+    claims = _decode(token)
+    if not claims:
+        return None
+    if _revocations.is_revoked(claims.get('jti')):
+        return None
+    return claims
+
+
+def revoke_token(token):
+    """
+    Додає токен до списку відкликаних (для /logout).
+    :return: True, якщо токен був валідний
+    """
+    decoded = _decode(token, return_timestamp=True)
+    if not decoded:
+        return False
+    claims, issued_at = decoded
+    # Пам'ятати відкликання треба лише до природного кінця терміну дії токена
+    ttl = TOKEN_MAX_AGE - (time.time() - issued_at.timestamp())
+    _revocations.revoke(claims['jti'], max(ttl, 1))
+    return True
+
+
+def token_from_request(req):
+    """
+    Дістає токен із заголовка Authorization: Bearer <token>.
+    """
+    header = req.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return None
@@ -0,0 +1,96 @@
+# benchmark_html.py
+"""
+Порівняння витягу тексту з HTML статей Guardian: BeautifulSoup + clean_text (старий шлях)
+проти потокового html_text.html_to_text.
+
+Тіла статей можна спершу завантажити з Guardian API (потрібен API_KEY_GUARDIAN):
+
+    python benchmark_html.py bodies.jsonl --fetch titles.txt --articles 5
+    python benchmark_html.py bodies.jsonl --repeat 20
+"""
+import argparse
+import json
+import os
+import time
+
+import requests
+
+from external_api import GUARDIAN_SEARCH_URL, HTTP_TIMEOUT, clean_text, guardian_params
+from html_text import html_to_text
+
+
+def soup_text(html_content):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, "html.parser")
+    return clean_text(soup.get_text(separator="\n"))
+
+
+def fetch_bodies(titles_path, out_path, articles):
+    with open(titles_path, encoding='utf-8') as f:
+        titles = [line.strip() for line in f if line.strip()]
+    count = 0
+    with open(out_path, 'w', encoding='utf-8') as out:
+        for title in titles:
+            response = requests.get(GUARDIAN_SEARCH_URL, params=guardian_params(title, page_size=articles),
+                                    timeout=HTTP_TIMEOUT)
+            if response.status_code != 200:
+                print(f"⚠️ {title}: HTTP {response.status_code}")
+                continue
+            for result in response.json().get("response", {}).get("results", []):
+                body = result.get("fields", {}).get("body")
+                if body:
+                    out.write(json.dumps({'title': title, 'body': body}, ensure_ascii=False) + "\n")
+                    count += 1
+    print(f"📥 Збережено {count} статей у {out_path}")
+
+
+def load_bodies(path):
+    if os.path.isdir(path):
+        bodies = []
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.html'):
+                with open(os.path.join(path, name), encoding='utf-8') as f:
+                    bodies.append(f.read())
+        return bodies
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line)['body'] for line in f if line.strip()]
+
+
+def measure(extract, bodies, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        texts = [extract(body) for body in bodies]
+    elapsed = time.perf_counter() - started
+    return elapsed / (repeat * len(bodies)), texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML-to-text extraction on Guardian article bodies")
+    parser.add_argument('bodies', help="JSONL with a body field, or a directory of .html files")
+    parser.add_argument('--fetch', metavar='TITLES', help="first download bodies for these titles into BODIES")
+    parser.add_argument('--articles', type=int, default=5, help="articles per title when fetching")
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_bodies(args.fetch, args.bodies, args.articles)
+    bodies = load_bodies(args.bodies)
+    if not bodies:
+        print("❌ Немає статей для порівняння")
+        return
+    html_bytes = sum(len(b.encode('utf-8')) for b in bodies) / len(bodies)
+    print(f"Статей: {len(bodies)}, середній розмір HTML: {html_bytes / 1024:.1f} КБ")
+
+    print(f"{'метод':<14}{'мс/статтю':>12}{'МБ/с':>10}{'слів':>10}")
+    results = {}
+    for name, extract in (('bs4', soup_text), ('html_text', html_to_text)):
+        per_article, texts = measure(extract, bodies, args.repeat)
+        words = sum(len(t.split()) for t in texts) / len(texts)
+        results[name] = per_article
+        print(f"{name:<14}{per_article * 1000:>12.3f}{html_bytes / per_article / 2**20:>10.2f}{words:>10.0f}")
+    print(f"Прискорення: ×{results['bs4'] / results['html_text']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
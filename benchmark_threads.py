@@ -0,0 +1,78 @@
+# benchmark_threads.py
+"""
+Підбір налаштувань паралелізму для CPU-інференсу.
+
+Для кожної комбінації intra-op потоків і кількості одночасних викликів запускає окремий
+процес (inter-op пул можна задати лише один раз на процес), надсилає моделі N запитів
+з відповідної кількості потоків і звітує пропускну здатність загалом і на ядро.
+
+    python benchmark_threads.py reviews.jsonl --stage bart --threads 1,2,4 --concurrency 1,2,4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Те саме, що ai_engine.MODEL_NAMES; батьківський процес не імпортує ai_engine, щоб не вантажити моделі
+MODEL_NAMES = ('bart', 't5', 'keepit', 'sentiment', 'spoiler', 'embedding')
+
+
+def _worker(args):
+    import ai_engine
+    from evaluation import load_reviews
+
+    texts = load_reviews(args.reviews)
+    stages = {
+        'bart': lambda t: ai_engine.summarize_with_bart(t),
+        't5': lambda t: ai_engine.simplify_with_t5(t),
+        'sentiment': lambda t: ai_engine.classify_sentiment([t[:2000]]),
+        'analysis': lambda t: ai_engine.run_analysis(t),
+    }
+    call = stages[args.stage]
+    call(texts[0])  # прогрів
+
+    jobs = [texts[i % len(texts)] for i in range(args.requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(call, jobs))
+    elapsed = time.perf_counter() - started
+    print(json.dumps({'elapsed': elapsed, 'requests': len(jobs)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep torch thread and model concurrency settings")
+    parser.add_argument('reviews', help="JSONL with a review field, or blank-line separated text")
+    parser.add_argument('--stage', choices=['bart', 't5', 'sentiment', 'analysis'], default='bart')
+    parser.add_argument('--threads', default='1,2,4')
+    parser.add_argument('--concurrency', default='1,2,4')
+    parser.add_argument('--requests', type=int, default=16)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args)
+        return
+
+    cores = os.cpu_count() or 1
+    print(f"{'intra':>6}{'concur':>8}{'запитів/с':>12}{'на ядро':>10}")
+    for threads in [int(t) for t in args.threads.split(',')]:
+        for concurrency in [int(c) for c in args.concurrency.split(',')]:
+            env = dict(os.environ,
+                       TORCH_INTRA_OP_THREADS=str(threads),
+                       TORCH_INTER_OP_THREADS='1',
+                       MODEL_THREADS=','.join(f"{m}={threads}" for m in MODEL_NAMES),
+                       MODEL_CONCURRENCY=','.join(f"{m}={concurrency}" for m in MODEL_NAMES))
+            cmd = [sys.executable, __file__, args.reviews, '--worker', '--stage', args.stage,
+                   '--requests', str(args.requests), '--concurrency', str(concurrency)]
+            output = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            throughput = result['requests'] / result['elapsed']
+            used_cores = min(cores, threads * concurrency)
+            print(f"{threads:>6}{concurrency:>8}{throughput:>12.3f}{throughput / used_cores:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# build_catalog.py
+"""
+Офлайн-побудова каталогу аналізів для популярних фільмів.
+
+Для кожної назви з файлу (одна назва на рядок) завантажує рецензії через external_api,
+аналізує текст для кожної вікової групи (run_analysis_all_ages) і перекладає результат на кожну мову.
+Результат пишеться в каталог, який /analyze перевіряє до будь-якої живої роботи.
+
+    python build_catalog.py titles.txt --languages en,uk --sources tmdb
+"""
+import argparse
+import time
+
+from ai_engine import run_analysis_all_ages
+from catalog import CATALOG_DIR, Catalog, catalog_key, write_catalog
+from external_api import search_guardian_reviews, get_movie_id, get_movie_reviews, get_movie_genres
+from external_async import aggregate_reviews_sync
+from translation_utils import translate_text
+
+
+def fetch_review(title, source):
+    """
+    :return: (текст рецензій, жанри) або None, якщо рецензій немає
+    """
+    if source == 'guardian':
+        text = search_guardian_reviews(title)
+        return (text, None) if text else None
+    if source == 'tmdb':
+        movie_id = get_movie_id(title)
+        if not movie_id:
+            return None
+        text = get_movie_reviews(movie_id)
+        if not text or text == "No user reviews found.":
+            return None
+        return text, get_movie_genres(movie_id)
+    if source == 'aggregate':
+        aggregated = aggregate_reviews_sync(title)
+        return (aggregated['text'], aggregated['genres']) if aggregated['text'] else None
+    raise ValueError(f"Unsupported source: {source}")
+
+
+def localize(result, language):
+    if language == 'en':
+        return result['summary'], result['sentiment'], result['keywords']
+    return (
+        translate_text(result['summary'], language),
+        translate_text(result['sentiment'], language),
+        [translate_text(k, language) for k in result['keywords']],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed analysis catalog")
+    parser.add_argument('titles', help="text file with one movie title per line")
+    parser.add_argument('--languages', default='en,uk')
+    parser.add_argument('--sources', default='tmdb')
+    parser.add_argument('--out', default=CATALOG_DIR)
+    parser.add_argument('--merge', action='store_true', help="keep existing catalog entries")
+    args = parser.parse_args()
+
+    languages = [l.strip() for l in args.languages.split(',') if l.strip()]
+    sources = [s.strip() for s in args.sources.split(',') if s.strip()]
+    with open(args.titles, encoding='utf-8') as f:
+        titles = [line.strip() for line in f if line.strip()]
+
+    entries = dict(Catalog(args.out).items()) if args.merge else {}
+    started = time.time()
+    for i, title in enumerate(titles, 1):
+        for source in sources:
+            try:
+                fetched = fetch_review(title, source)
+            except Exception as e:
+                print(f"❌ {title} ({source}): {e}")
+                continue
+            if not fetched:
+                print(f"⚠️ {title} ({source}): рецензій не знайдено")
+                continue
+            text, genres = fetched
+
+            for bucket, result in run_analysis_all_ages(text).items():
+                for language in languages:
+                    summary, sentiment, keywords = localize(result, language)
+                    entries[catalog_key(title, source, bucket, language)] = {
+                        'title': title,
+                        'summary': summary,
+                        'sentiment': sentiment,
+                        'keywords': keywords,
+                        'genres': genres,
+                    }
+        elapsed = time.time() - started
+        print(f"✅ [{i}/{len(titles)}] {title} — {elapsed / i:.1f} с/фільм")
+
+    write_catalog(args.out, entries)
+    print(f"🗂️ Каталог записано: {len(entries)} записів у {args.out}")
+
+
+if __name__ == '__main__':
+    main()
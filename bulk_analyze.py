@@ -0,0 +1,250 @@
+# bulk_analyze.py
+"""
+Офлайн-аналіз великої кількості фільмів або рецензій у пулі процесів.
+
+Вхід — JSONL або CSV, кожен рядок містить або `title` (+ `source`: tmdb/guardian),
+або `review` з готовим текстом; опційно `id` та `age`. Моделі завантажуються один раз
+у батьківському процесі, і воркери, створені через fork, ділять ці ваги (copy-on-write,
+ваги під час інференсу не змінюються); рядки обробляються батчами через run_analysis_batch.
+Де fork недоступний (або з --no-share-models), кожен воркер вантажить власну копію.
+Результати пишуться потоково в JSONL або Parquet; готові id записуються в
+<out>.ckpt, тож перерваний запуск можна продовжити тією ж командою.
+
+    python bulk_analyze.py titles.jsonl results.jsonl --workers 4 --batch-size 8
+"""
+import argparse
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from external_api import search_guardian_reviews, get_movie_id, get_movie_reviews
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    for n, row in enumerate(rows, 1):
+        if row.get('age') in ('', None):
+            row['age'] = None
+        else:
+            row['age'] = int(row['age'])
+        row['id'] = str(row.get('id') or _fallback_id(row) or f"line-{n}")
+    return rows
+
+
+def _fallback_id(row):
+    """
+    id рядка без явного id: той самий фільм з іншим віком чи джерелом — інший рядок.
+    """
+    if row.get('review'):
+        subject = 'review:' + hashlib.sha1(row['review'].encode('utf-8')).hexdigest()[:16]
+    elif row.get('title'):
+        subject = f"{row['title']}|{row.get('source') or 'tmdb'}"
+    else:
+        return None
+    return f"{subject}|{row['age'] if row['age'] is not None else ''}"
+
+
+def _init_worker(threads):
+    # Після fork моделі вже в пам'яті (спільні з батьківським процесом), інакше вантажаться тут
+    import torch
+    torch.set_num_threads(threads)
+    import ai_engine
+    # Потоки моделей у батьківському процесі пораховано на всі ядра — воркер має свою частку
+    for name in ai_engine.MODEL_THREADS:
+        ai_engine.MODEL_THREADS[name] = threads
+
+
+def _shared_models_context():
+    """
+    Контекст fork з моделями, завантаженими до створення воркерів; None, якщо fork недоступний.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    import torch
+    import ai_engine
+    # Ваги лише читаються: без градієнтів сторінки пам'яті не копіюються у воркерах
+    torch.set_grad_enabled(False)
+    for model in (ai_engine.bart_model, ai_engine.t5_model, ai_engine.sentiment_pipeline.model,
+                  ai_engine.spoiler_detector.model, ai_engine.kw_model.model.embedding_model):
+        model.eval()
+        model.requires_grad_(False)
+    return multiprocessing.get_context('fork')
+
+
+def _fetch_text(row):
+    if row.get('review'):
+        return row['review']
+    source = row.get('source') or 'tmdb'
+    if source == 'guardian':
+        return search_guardian_reviews(row['title'])
+    movie_id = get_movie_id(row['title'])
+    if not movie_id:
+        return None
+    text = get_movie_reviews(movie_id)
+    return None if text == "No user reviews found." else text
+
+
+def _analyze_batch(rows):
+    from ai_engine import run_analysis_batch
+
+    results = []
+    ready_rows, texts = [], []
+    for row in rows:
+        try:
+            text = _fetch_text(row)
+        except Exception as e:
+            results.append({'id': row['id'], 'error': str(e)})
+            continue
+        if not text:
+            results.append({'id': row['id'], 'error': 'no review found'})
+            continue
+        ready_rows.append(row)
+        texts.append(text)
+
+    if texts:
+        try:
+            analyses = run_analysis_batch(texts, ages=[row['age'] for row in ready_rows])
+        except Exception as e:
+            analyses = [{'error': str(e)}] * len(texts)
+        for row, analysis in zip(ready_rows, analyses):
+            analysis.pop('embedding', None)
+            results.append({'id': row['id'], 'title': row.get('title'), 'age': row['age'], **analysis})
+    return results
+
+
+class ResultWriter:
+    """
+    Потоковий запис результатів у JSONL або Parquet (потрібен pyarrow) з чекпойнтом готових id.
+    Рядки з помилкою позначаються в чекпойнті як '!id': їх буде перероблено, але повторна
+    та сама помилка вдруге у вихідний файл не пишеться.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.checkpoint_path = path + '.ckpt'
+        self.parquet = path.endswith('.parquet')
+        self._part = 0
+        if self.parquet:
+            import pyarrow  # noqa: F401 — падаємо одразу, а не після першого батча
+            os.makedirs(path, exist_ok=True)
+            self._run = time.strftime('%Y%m%d%H%M%S')
+            self._out = None
+        else:
+            self._out = open(path, 'a', encoding='utf-8')
+        self._errored = self._read_checkpoint()[1]
+        self._ckpt = open(self.checkpoint_path, 'a', encoding='utf-8')
+
+    def _read_checkpoint(self):
+        done, errored = set(), set()
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.rstrip('\n')
+                    if line.startswith('!'):
+                        errored.add(line[1:])
+                    elif line:
+                        done.add(line)
+        return done, errored
+
+    def done_ids(self):
+        return self._read_checkpoint()[0]
+
+    @staticmethod
+    def _parquet_schema():
+        # Явна схема: інакше pyarrow виводить її з першого рядка, і пачка, що починається
+        # з помилки, втрачає колонки результату (або навпаки)
+        import pyarrow as pa
+        return pa.schema([
+            ('id', pa.string()), ('title', pa.string()), ('age', pa.int64()),
+            ('summary', pa.string()), ('sentiment', pa.string()), ('keywords', pa.string()),
+            ('error', pa.string()),
+        ])
+
+    def write(self, results):
+        results = [r for r in results if 'error' not in r or r['id'] not in self._errored]
+        if not results:
+            return
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            rows = [{**r, 'keywords': json.dumps(r['keywords'], ensure_ascii=False) if 'keywords' in r else None}
+                    for r in results]
+            part = os.path.join(self.path, f"part-{self._run}-{self._part:05d}.parquet")
+            pq.write_table(pa.Table.from_pylist(rows, schema=self._parquet_schema()), part)
+            self._part += 1
+        else:
+            for r in results:
+                self._out.write(json.dumps(r, ensure_ascii=False) + '\n')
+            self._out.flush()
+        # Чекпойнт пишеться лише після того, як результат уже на диску
+        for r in results:
+            if 'error' in r:
+                self._errored.add(r['id'])
+                self._ckpt.write('!' + r['id'] + '\n')
+            else:
+                self._ckpt.write(r['id'] + '\n')
+        self._ckpt.flush()
+
+    def close(self):
+        if self._out:
+            self._out.close()
+        self._ckpt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk offline analysis of titles or reviews")
+    parser.add_argument('input', help="JSONL or CSV with title/source or review per row")
+    parser.add_argument('output', help="results .jsonl or .parquet (directory of parts)")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--report-every', type=int, default=50)
+    parser.add_argument('--no-share-models', action='store_true',
+                        help="load a private copy of the models in every worker instead of forking after loading")
+    args = parser.parse_args()
+
+    writer = ResultWriter(args.output)
+    done = writer.done_ids()
+    rows = [row for row in read_rows(args.input) if row['id'] not in done]
+    print(f"📥 До обробки: {len(rows)} рядків (пропущено вже готових: {len(done)})")
+
+    batches = [rows[i:i + args.batch_size] for i in range(0, len(rows), args.batch_size)]
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    context = None if args.no_share_models else _shared_models_context()
+    if context is not None:
+        print("📦 Моделі завантажено в батьківському процесі — воркери ділять ваги")
+
+    started = time.time()
+    processed = errors = 0
+    next_report = args.report_every
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(threads,)) as pool:
+            futures = [pool.submit(_analyze_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                results = future.result()
+                writer.write(results)
+                processed += len(results)
+                errors += sum(1 for r in results if 'error' in r)
+                if processed >= next_report:
+                    elapsed = time.time() - started
+                    print(f"⏱️ {processed}/{len(rows)} — {processed / elapsed:.2f} рядків/с")
+                    next_report += args.report_every
+    finally:
+        writer.close()
+        elapsed = time.time() - started
+        print("📊 Звіт:")
+        print(f"   оброблено: {processed}, помилок: {errors}")
+        print(f"   час: {elapsed:.1f} с, пропускна здатність: {processed / elapsed if elapsed else 0:.2f} рядків/с")
+        print(f"   воркерів: {args.workers} × {threads} потоків torch")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# catalog.py
+import json
+import mmap
+import os
+import threading
+import time
+
+from curated import normalize_title
+
+CATALOG_DIR = os.getenv(
+    "CATALOG_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'catalog')
+)
+CATALOG_RELOAD_INTERVAL = float(os.getenv("CATALOG_RELOAD_INTERVAL", 30))
+
+
+def catalog_key(title, source, bucket, language):
+    return f"{normalize_title(title)}|{source}|{bucket}|{language}"
+
+
+def write_catalog(directory, entries):
+    """
+    Записує каталог: catalog.dat — послідовні JSON-записи, catalog.idx — ключ -> [offset, length].
+    :param entries: словник ключ -> запис
+    """
+    os.makedirs(directory, exist_ok=True)
+    data_path = os.path.join(directory, 'catalog.dat')
+    index_path = os.path.join(directory, 'catalog.idx')
+
+    index = {}
+    offset = 0
+    with open(data_path + '.tmp', 'wb') as f:
+        for key, record in entries.items():
+            blob = json.dumps(record, ensure_ascii=False).encode('utf-8')
+            f.write(blob)
+            index[key] = [offset, len(blob)]
+            offset += len(blob)
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+    # Індекс підміняється останнім: читач перечитує каталог за його mtime
+    os.replace(data_path + '.tmp', data_path)
+    os.replace(index_path + '.tmp', index_path)
+
+
+class Catalog:
+    """
+    Read-only каталог заздалегідь порахованих аналізів популярних фільмів.
+
+    Дані відображаються в пам'ять (mmap), у RAM тримається лише індекс зміщень.
+    """
+
+    def __init__(self, directory=CATALOG_DIR, reload_interval=CATALOG_RELOAD_INTERVAL):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self._data_path = os.path.join(directory, 'catalog.dat')
+        self._index_path = os.path.join(directory, 'catalog.idx')
+        self._index = {}
+        self._mm = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def __len__(self):
+        return len(self._index)
+
+    def reload(self):
+        try:
+            mtime = os.path.getmtime(self._index_path)
+            with open(self._index_path, encoding='utf-8') as f:
+                index = json.load(f)
+            with open(self._data_path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(self._data_path) else None
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"❌ Не вдалося відкрити каталог {self.directory}: {e}")
+            return
+        with self._lock:
+            old, self._index, self._mm, self._mtime = self._mm, index, mm, mtime
+        # Читачі беруть self._mm лише під замком, тож старе відображення вже ніхто не використовує
+        if old is not None:
+            old.close()
+        print(f"🗂️ Каталог аналізів завантажено: {len(index)} записів")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self._index_path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    def get(self, title, source, bucket, language):
+        """
+        :return: запис {'title', 'summary', 'sentiment', 'keywords', 'genres'} або None
+        """
+        self._maybe_reload()
+        with self._lock:
+            pos = self._index.get(catalog_key(title, source, bucket, language))
+            if pos is None or self._mm is None:
+                return None
+            offset, length = pos
+            return json.loads(self._mm[offset:offset + length].decode('utf-8'))
+
+    def items(self):
+        """
+        Усі записи; якщо каталог перезавантажився під час обходу, решта читається вже з нового.
+        """
+        with self._lock:
+            keys = list(self._index)
+        for key in keys:
+            with self._lock:
+                pos = self._index.get(key)
+                if pos is None or self._mm is None:
+                    continue
+                offset, length = pos
+                blob = self._mm[offset:offset + length]
+            yield key, json.loads(blob.decode('utf-8'))
+
+
+catalog = Catalog()
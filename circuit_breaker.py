@@ -0,0 +1,147 @@
+# circuit_breaker.py
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+# Ковзне вікно (секунди) і мінімум викликів у ньому, після якого breaker може розімкнутися
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", 30))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", 10))
+# Частка помилок або повільних викликів, за якої залежність вважається недоступною
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", 0.5))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", 0.8))
+BREAKER_SLOW_CALL = float(os.getenv("BREAKER_SLOW_CALL", 5))
+# Скільки секунд breaker розімкнений, перш ніж пропустити пробний виклик
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", 30))
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class UpstreamError(Exception):
+    """
+    Зовнішній сервіс не відповів або відповів помилкою.
+    """
+
+    def __init__(self, service, message, retry_after=None):
+        super().__init__(f"{service}: {message}")
+        self.service = service
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Запобіжник для зовнішньої залежності.
+
+    closed — виклики проходять, результати (помилка, затримка) пишуться у ковзне вікно;
+    open — виклики одразу отримують CircuitOpenError; half_open — після паузи пропускається
+    один пробний виклик: успіх замикає breaker, помилка знову розмикає.
+    """
+
+    def __init__(self, name, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS, error_rate=BREAKER_ERROR_RATE,
+                 slow_call=BREAKER_SLOW_CALL, slow_rate=BREAKER_SLOW_RATE, open_seconds=BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self._calls = deque()  # (час, помилка, повільний)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def _retry_after(self, now):
+        return max(1, int(self._opened_at + self.open_seconds - now + 0.999))
+
+    def before_call(self):
+        """
+        :raises CircuitOpenError: якщо виклик не можна пропускати
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._state = HALF_OPEN
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.name, "circuit open", retry_after=self._retry_after(now))
+
+    def after_call(self, failed, elapsed):
+        now = time.monotonic()
+        slow = elapsed >= self.slow_call
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._state = CLOSED
+                    self._calls.clear()
+                return
+            self._calls.append((now, failed, slow))
+            while self._calls and now - self._calls[0][0] > self.window:
+                self._calls.popleft()
+            total = len(self._calls)
+            if self._state == CLOSED and total >= self.min_calls:
+                failures = sum(1 for _, f, _ in self._calls if f)
+                slow_calls = sum(1 for _, _, s in self._calls if s)
+                if failures / total >= self.error_rate or slow_calls / total >= self.slow_rate:
+                    self._open(now)
+
+    def cancel_call(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._calls.clear()
+        print(f"⚡ Circuit breaker '{self.name}' розімкнено на {self.open_seconds:.0f} с")
+
+    def call(self, fn, *args, **kwargs):
+        self.before_call()
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.after_call(True, time.monotonic() - started)
+            raise
+        self.after_call(False, time.monotonic() - started)
+        return result
+
+    async def acall(self, fn, *args, **kwargs):
+        self.before_call()
+        started = time.monotonic()
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            # Скасування (наприклад, клієнт пішов) — не вина залежності, але пробу треба звільнити
+            self.cancel_call()
+            raise
+        except Exception:
+            self.after_call(True, time.monotonic() - started)
+            raise
+        self.after_call(False, time.monotonic() - started)
+        return result
+
+
+breakers = {
+    'tmdb': CircuitBreaker('tmdb'),
+    'guardian': CircuitBreaker('guardian'),
+    'translate': CircuitBreaker('translate', slow_call=float(os.getenv("TRANSLATE_SLOW_CALL", 3))),
+}
@@ -0,0 +1,60 @@
+# compare_generation.py
+"""
+Звіт про якість і швидкість режимів генерації BART.
+
+Базова лінія — старі фіксовані бюджети з beam search (4 промені); порівнюються
+динамічні бюджети з beam search та greedy-режими. Для кожного режиму —
+середня затримка, довжина summary та ROUGE відносно базової лінії.
+
+    python compare_generation.py reviews.jsonl
+"""
+import argparse
+import time
+
+from ai_engine import summarize_with_bart
+from evaluation import load_reviews, mean_scores, rouge_scores
+
+MODES = {
+    'fixed+beam (baseline)': {'fast': False, 'dynamic': False},
+    'dynamic+beam': {'fast': False, 'dynamic': True},
+    'fixed+greedy': {'fast': True, 'dynamic': False},
+    'dynamic+greedy': {'fast': True, 'dynamic': True},
+}
+
+
+def adult_limits(text):
+    # Ті самі стелі, що й run_summary_adapted для дорослих
+    return (510, 490) if len(text) > 1000 else (200, 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare BART generation budgets and decoding modes")
+    parser.add_argument('reviews', help="JSONL with a review field, or text with blank-line separated reviews")
+    args = parser.parse_args()
+
+    reviews = load_reviews(args.reviews)
+    if not reviews:
+        parser.error("no reviews found")
+    outputs = {mode: [] for mode in MODES}
+    latencies = {mode: [] for mode in MODES}
+
+    for i, text in enumerate(reviews, 1):
+        max_len, min_len = adult_limits(text)
+        for mode, options in MODES.items():
+            started = time.perf_counter()
+            outputs[mode].append(summarize_with_bart(text, max_len=max_len, min_len=min_len, **options))
+            latencies[mode].append(time.perf_counter() - started)
+        print(f"✅ {i}/{len(reviews)}")
+
+    baseline = outputs['fixed+beam (baseline)']
+    print(f"\n{'режим':<24}{'сер. час, с':>12}{'слів':>8}{'ROUGE-1':>10}{'ROUGE-2':>10}{'ROUGE-L':>10}")
+    for mode in MODES:
+        scores = mean_scores([rouge_scores(c, r) for c, r in zip(outputs[mode], baseline)])
+        avg_latency = sum(latencies[mode]) / len(reviews)
+        avg_words = sum(len(o.split()) for o in outputs[mode]) / len(reviews)
+        print(f"{mode:<24}{avg_latency:>12.2f}{avg_words:>8.0f}"
+              f"{scores['rouge1']:>10.3f}{scores['rouge2']:>10.3f}{scores['rougeL']:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
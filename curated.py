@@ -0,0 +1,99 @@
+# curated.py
+import json
+import os
+import re
+import threading
+import time
+
+CURATED_TITLES_PATH = os.getenv(
+    "CURATED_TITLES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'curated_titles.json')
+)
+CURATED_RELOAD_INTERVAL = float(os.getenv("CURATED_RELOAD_INTERVAL", 5))
+
+
+def normalize_title(title):
+    """
+    Нормалізує назву для пошуку: регістр, пунктуація та зайві пробіли не важливі.
+    """
+    title = re.sub(r"[^\w\s]", " ", (title or "").casefold())
+    return re.sub(r"\s+", " ", title).strip()
+
+
+class CuratedStore:
+    """
+    Кураторські (заздалегідь підготовлені) результати для окремих фільмів.
+
+    Записи читаються з JSON-файлу в хеш-індекс за нормалізованою назвою та аліасами.
+    Файл перечитується автоматично, якщо змінився його mtime.
+    """
+
+    def __init__(self, path=CURATED_TITLES_PATH, reload_interval=CURATED_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._index = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """
+        Перебудовує індекс з файлу. При помилці залишається попередній індекс.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries, mtime = [], None
+        except (OSError, ValueError) as e:
+            print(f"❌ Не вдалося прочитати {self.path}: {e}")
+            return
+
+        index = {}
+        loaded = 0
+        for n, entry in enumerate(entries, 1):
+            if not isinstance(entry, dict) or not entry.get('title'):
+                print(f"⚠️ {self.path}: запис #{n} без 'title' пропущено")
+                continue
+            aliases = entry.get('aliases') or []
+            if isinstance(aliases, str):
+                aliases = [aliases]
+            elif not isinstance(aliases, list):
+                print(f"⚠️ {self.path}: у записі '{entry['title']}' некоректні aliases — пропущено")
+                aliases = []
+            for name in [entry['title']] + [a for a in aliases if isinstance(a, str)]:
+                key = normalize_title(name)
+                if key:
+                    index[key] = entry
+            loaded += 1
+        with self._lock:
+            self._index = index
+            self._mtime = mtime
+        print(f"📚 Кураторські записи завантажено: {loaded}")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self.reload()
+
+    def get(self, title):
+        """
+        :return: запис {'title', 'summary', 'sentiment', 'keywords', 'genres'} або None
+        """
+        self._maybe_reload()
+        return self._index.get(normalize_title(title))
+
+    def titles(self):
+        return sorted({entry['title'] for entry in self._index.values()})
+
+
+curated_store = CuratedStore()
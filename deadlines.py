@@ -0,0 +1,47 @@
+# deadlines.py
+import threading
+import time
+
+
+class Deadline:
+    """
+    Дедлайн запиту з кооперативним скасуванням.
+
+    Етапи конвеєра перевіряють expired() і завершуються достроково; stage() видає
+    піддедлайн для окремого етапу, який скасовується разом із батьківським.
+
+    cancel() викликає лише ASGI-режим (asgi.py), коли клієнт відключився: WSGI-сервер не
+    повідомляє Flask про розірване з'єднання, тож у Flask-маршрутах аналіз обмежує тільки час.
+    """
+
+    def __init__(self, seconds=None, _expires_at=None, _cancelled=None):
+        if _expires_at is None and seconds is not None:
+            _expires_at = time.monotonic() + seconds
+        self.expires_at = _expires_at
+        self._cancelled = _cancelled or threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        if self._cancelled.is_set():
+            return True
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def stage(self, share):
+        """
+        Піддедлайн на частку share часу, що залишився.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return Deadline(_cancelled=self._cancelled)
+        return Deadline(_expires_at=time.monotonic() + remaining * share, _cancelled=self._cancelled)
@@ -0,0 +1,75 @@
+# dedupe.py
+"""
+Відсів майже однакових рецензій (SimHash) і обмеження сумарного обсягу тексту в токенах.
+"""
+import hashlib
+import re
+
+_WORD_RE = re.compile(r"\w+")
+# Рецензії з відстанню Геммінга SimHash не більше цієї вважаються дублікатами
+SIMHASH_DISTANCE = 3
+
+
+def _shingles(text, size=3):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return [' '.join(words)] if words else []
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text, bits=64):
+    """
+    64-бітний SimHash за словесними триграмами.
+    """
+    weights = [0] * bits
+    for shingle in _shingles(text):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for i in range(bits):
+            weights[i] += 1 if h >> i & 1 else -1
+    return sum(1 << i for i, w in enumerate(weights) if w > 0)
+
+
+def dedupe_texts(texts, max_distance=SIMHASH_DISTANCE):
+    """
+    :return: (унікальні тексти в початковому порядку, кількість відкинутих дублікатів)
+    """
+    kept, hashes = [], []
+    for text in texts:
+        h = simhash(text)
+        if any(bin(h ^ other).count('1') <= max_distance for other in hashes):
+            continue
+        kept.append(text)
+        hashes.append(h)
+    return kept, len(texts) - len(kept)
+
+
+def estimate_tokens(text):
+    """
+    Груба оцінка кількості субслівних токенів (~4/3 токена на англійське слово) без токенізатора.
+    """
+    return (len(_WORD_RE.findall(text)) * 4 + 2) // 3
+
+
+def fit_token_budget(texts, budget):
+    """
+    Тексти по порядку, поки вони вміщаються в бюджет; ті, що не вміщаються, пропускаються.
+    Якщо не вміщається вже перший текст, береться його початок.
+    """
+    selected, used = [], 0
+    for text in texts:
+        cost = estimate_tokens(text)
+        if used + cost <= budget:
+            selected.append(text)
+            used += cost
+        elif not selected:
+            selected.append(truncate_tokens(text, budget))
+            used = budget
+    return selected
+
+
+def truncate_tokens(text, budget):
+    words = list(_WORD_RE.finditer(text))
+    keep = budget * 3 // 4
+    if len(words) <= keep:
+        return text
+    return text[:words[keep - 1].end()] if keep else ''
@@ -0,0 +1,115 @@
+# evaluate_summarizer.py
+"""
+Перевірка якості альтернативної (дистильованої) моделі summary перед перемиканням SUMMARIZER_MODEL.
+
+Обидві моделі узагальнюють той самий відкладений набір рецензій з однаковими бюджетами;
+виходи кандидата оцінюються ROUGE відносно виходів поточної моделі. Якщо середній
+ROUGE-L нижчий за поріг, скрипт завершується з кодом 1.
+
+    python evaluate_summarizer.py heldout.jsonl --candidate sshleifer/distilbart-cnn-12-6 --min-rougeL 0.45
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import ai_engine
+from evaluation import load_reviews, mean_scores, rouge_scores
+
+
+def summarizer_for(name):
+    if name == ai_engine.SUMMARIZER_MODEL:
+        return ai_engine.bart_tokenizer, ai_engine.bart_model
+    return ai_engine.load_summarizer(name)
+
+
+def run(tokenizer, model, reviews):
+    outputs, latencies = [], []
+    for text in reviews:
+        max_len, min_len = (510, 490) if len(text) > 1000 else (200, 100)
+        started = time.perf_counter()
+        outputs.append(ai_engine.summarize_with(tokenizer, model, text, max_len, min_len))
+        latencies.append(time.perf_counter() - started)
+    return outputs, latencies
+
+
+def review_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def load_reference_cache(path):
+    """
+    Усі еталонні summary з кешу: (модель, хеш рецензії) → summary; записи старого формату ігноруються.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    cached = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get('model') and entry.get('review'):
+                cached[(entry['model'], entry['review'])] = entry['summary']
+    return cached
+
+
+def save_reference_cache(path, cached):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for (model, review), summary in cached.items():
+            f.write(json.dumps({'review': review, 'model': model, 'summary': summary}, ensure_ascii=False) + '\n')
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a candidate summarizer against the current one")
+    parser.add_argument('reviews', help="held-out reviews: JSONL with a review field or blank-line separated text")
+    parser.add_argument('--candidate', default='sshleifer/distilbart-cnn-12-6')
+    parser.add_argument('--reference', default='facebook/bart-large-cnn')
+    parser.add_argument('--reference-cache', help="JSONL to reuse/store reference outputs between runs "
+                                                  "(entries are keyed by review hash and reference model)")
+    parser.add_argument('--min-rougeL', type=float, default=0.45)
+    args = parser.parse_args()
+
+    reviews = load_reviews(args.reviews)
+    if not reviews:
+        parser.error("no reviews found")
+
+    reference_latency = None
+    keys = [(args.reference, review_hash(text)) for text in reviews]
+    cached = load_reference_cache(args.reference_cache)
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    if not missing:
+        print(f"♻️ Еталонні summary взято з {args.reference_cache}")
+    else:
+        if len(missing) < len(reviews):
+            print(f"⚠️ Кеш {args.reference_cache} не покриває {len(missing)} з {len(reviews)} рецензій — дораховуємо")
+        outputs, latencies = run(*summarizer_for(args.reference), [reviews[i] for i in missing])
+        reference_latency = sum(latencies) / len(latencies)
+        cached.update((keys[i], summary) for i, summary in zip(missing, outputs))
+        if args.reference_cache:
+            # Записи інших моделей і рецензій лишаються в кеші
+            save_reference_cache(args.reference_cache, cached)
+    references = [cached[key] for key in keys]
+
+    candidates, latencies = run(*summarizer_for(args.candidate), reviews)
+    candidate_latency = sum(latencies) / len(latencies)
+    scores = mean_scores([rouge_scores(c, r) for c, r in zip(candidates, references)])
+
+    print(f"📊 {args.candidate} проти {args.reference} на {len(reviews)} рецензіях")
+    print(f"   ROUGE-1 {scores['rouge1']:.3f}  ROUGE-2 {scores['rouge2']:.3f}  ROUGE-L {scores['rougeL']:.3f}")
+    print(f"   час кандидата: {candidate_latency:.2f} с/рецензію")
+    if reference_latency:
+        print(f"   час еталону: {reference_latency:.2f} с/рецензію (прискорення ×{reference_latency / candidate_latency:.2f})")
+
+    if scores['rougeL'] < args.min_rougeL:
+        print(f"❌ ROUGE-L нижче порогу {args.min_rougeL} — кандидат не проходить")
+        sys.exit(1)
+    print(f"✅ Кандидат проходить поріг ROUGE-L {args.min_rougeL}")
+
+
+if __name__ == '__main__':
+    main()
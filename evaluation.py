@@ -0,0 +1,67 @@
+# evaluation.py
+"""
+Метрики якості summary (ROUGE-1/2/L F1) без зовнішніх залежностей.
+"""
+import json
+import re
+from collections import Counter
+
+
+def _tokens(text):
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def _f1(overlap, candidate_total, reference_total):
+    if not overlap or not candidate_total or not reference_total:
+        return 0.0
+    precision = overlap / candidate_total
+    recall = overlap / reference_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(candidate, reference, n=1):
+    cand = _tokens(candidate)
+    ref = _tokens(reference)
+    cand_ngrams = Counter(tuple(cand[i:i + n]) for i in range(len(cand) - n + 1))
+    ref_ngrams = Counter(tuple(ref[i:i + n]) for i in range(len(ref) - n + 1))
+    overlap = sum((cand_ngrams & ref_ngrams).values())
+    return _f1(overlap, sum(cand_ngrams.values()), sum(ref_ngrams.values()))
+
+
+def rouge_l(candidate, reference):
+    cand = _tokens(candidate)
+    ref = _tokens(reference)
+    if not cand or not ref:
+        return 0.0
+    # Довжина найдовшої спільної підпослідовності, O(len(cand) * len(ref)) з одним рядком пам'яті
+    prev = [0] * (len(ref) + 1)
+    for c in cand:
+        row = [0]
+        for j, r in enumerate(ref, 1):
+            row.append(prev[j - 1] + 1 if c == r else max(prev[j], row[j - 1]))
+        prev = row
+    return _f1(prev[-1], len(cand), len(ref))
+
+
+def rouge_scores(candidate, reference):
+    return {
+        'rouge1': rouge_n(candidate, reference, 1),
+        'rouge2': rouge_n(candidate, reference, 2),
+        'rougeL': rouge_l(candidate, reference),
+    }
+
+
+def mean_scores(scores):
+    if not scores:
+        return {'rouge1': 0.0, 'rouge2': 0.0, 'rougeL': 0.0}
+    return {key: sum(s[key] for s in scores) / len(scores) for key in scores[0]}
+
+
+def load_reviews(path):
+    """
+    Рецензії з JSONL (поле review) або з текстового файлу, де рецензії розділені порожнім рядком.
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line)['review'] for line in f if line.strip()]
+        return [block.strip() for block in f.read().split('\n\n') if block.strip()]
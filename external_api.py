@@ -1,11 +1,15 @@
 import os
 from dotenv import load_dotenv
 import requests
-from bs4 import BeautifulSoup
+from html_text import html_to_text
+from title_index import title_index, parse_year
+from circuit_breaker import breakers, UpstreamError
 
 load_dotenv()
 API_KEY_GUARDIAN = os.getenv("API_KEY_GUARDIAN")
 API_KEY_TMDB = os.getenv("API_KEY_TMDB")
+# Таймаут одного HTTP-запиту до зовнішніх API, секунди
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 10))
 
 
 def clean_text(text: str) -> str:
@@ -14,48 +18,130 @@ def clean_text(text: str) -> str:
     return "\n\n".join(cleaned_lines)
 
 
-def search_guardian_reviews(title: str):
-    url = "https://content.guardianapis.com/search"
-    params = {
+GUARDIAN_SEARCH_URL = "https://content.guardianapis.com/search"
+TMDB_URL = "https://api.themoviedb.org/3"
+
+
+def guardian_params(title: str, page_size: int = 1):
+    return {
         "q": f"{title} review",
         "section": "film",
         "tag": "film/film",
         "type": "article",
         "show-fields": "body",
         "api-key": API_KEY_GUARDIAN,
-        "page-size": 1
+        "page-size": page_size
+    }
+
+
+def guardian_body_text(html_content):
+    return html_to_text(html_content)
+
+
+def parse_guardian_reviews(data):
+    results = data.get("response", {}).get("results", [])
+    return [guardian_body_text(r.get("fields", {}).get("body", "")) for r in results]
+
+
+def parse_guardian_review(data):
+    reviews = parse_guardian_reviews(data)
+    return reviews[0] if reviews else None
+
+
+def combine_reviews(reviews):
+    return "\n".join(r['content'] for r in reviews if 'content' in r)
+
+
+def tmdb_search_params(title):
+    query, year = parse_year(title)
+    params = {"api_key": API_KEY_TMDB, "query": query}
+    if year:
+        params["year"] = year
+    return params
+
+
+def parse_search_result(data):
+    """
+    :return: {'id', 'title', 'year'} першого результату пошуку TMDb або None
+    """
+    results = data.get("results", [])
+    if not results:
+        return None
+    release = results[0].get('release_date') or ''
+    return {
+        'id': results[0]['id'],
+        'title': results[0].get('title'),
+        'year': int(release[:4]) if release[:4].isdigit() else None,
     }
-    response = requests.get(url, params=params)
+
+
+def parse_genres(data):
+    return ','.join(g['name'] for g in data.get('genres', []))
+
+
+def is_upstream_failure(status_code):
+    return status_code >= 500 or status_code == 429
+
+
+def _get(service, url, params):
+    """
+    GET через circuit breaker сервісу; 5xx/429 і мережеві помилки рахуються як збої.
+    :raises UpstreamError: сервіс недоступний або breaker розімкнений
+    """
+    def call():
+        response = requests.get(url, params=params, timeout=HTTP_TIMEOUT)
+        if is_upstream_failure(response.status_code):
+            raise UpstreamError(service, f"HTTP {response.status_code}")
+        return response
+
+    try:
+        return breakers[service].call(call)
+    except requests.RequestException as e:
+        raise UpstreamError(service, str(e)) from e
+
+
+def search_guardian_reviews(title: str):
+    response = _get('guardian', GUARDIAN_SEARCH_URL, guardian_params(title))
     if response.status_code == 200:
-        data = response.json()
-        results = data.get("response", {}).get("results", [])
-        if not results:
-            return None
-        html_content = results[0].get("fields", {}).get("body", "")
-        soup = BeautifulSoup(html_content, "html.parser")
-        return clean_text(soup.get_text(separator="\n"))
+        return parse_guardian_review(response.json())
     return None
 
 
-def get_movie_id(title):
-    url = "https://api.themoviedb.org/3/search/movie"
-    params = {"api_key": API_KEY_TMDB, "query": title}
-    response = requests.get(url, params=params)
+def search_movie(title):
+    response = _get('tmdb', f"{TMDB_URL}/search/movie", tmdb_search_params(title))
     if response.status_code == 200:
-        results = response.json().get("results", [])
-        if results:
-            return results[0]['id']
+        return parse_search_result(response.json())
     return None
 
 
+def get_movie_id(title):
+    # Спершу локальний індекс назв; TMDb — лише для невідомих фільмів
+    movie_id = title_index.resolve(title)
+    if movie_id is not None:
+        return movie_id
+    movie = search_movie(title)
+    if not movie:
+        return None
+    title_index.add(title, movie['id'], movie['title'], movie['year'])
+    return movie['id']
+
+
 def get_movie_reviews(movie_id):
-    url = f"https://api.themoviedb.org/3/movie/{movie_id}/reviews"
+    url = f"{TMDB_URL}/movie/{movie_id}/reviews"
     params = {"api_key": API_KEY_TMDB, "language": "en-US"}
-    response = requests.get(url, params=params)
+    response = _get('tmdb', url, params)
 
     if response.status_code == 200:
         reviews = response.json().get("results", [])
         if reviews:
-            combined_reviews = "\n".join(r['content'] for r in reviews if 'content' in r)
-            return combined_reviews
+            return combine_reviews(reviews)
     return "No user reviews found."
+
+
+def get_movie_genres(movie_id):
+    url = f"{TMDB_URL}/movie/{movie_id}"
+    params = {"api_key": API_KEY_TMDB, "language": "en-US"}
+    response = _get('tmdb', url, params)
+    if response.status_code == 200:
+        return parse_genres(response.json())
+    return None
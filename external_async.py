@@ -0,0 +1,362 @@
+# external_async.py
+"""
+Асинхронний клієнт зовнішніх API на httpx: незалежні запити виконуються паралельно.
+
+Для TMDb після пошуку ID одночасно завантажуються деталі фільму (жанри) та кілька сторінок
+рецензій; рецензію Guardian можна отримувати паралельно з усім цим. Flask-маршрути
+користуються синхронним фасадом fetch_movie_sync, який виконує корутини у фоновому
+event loop зі спільним пулом з'єднань.
+"""
+import asyncio
+import contextlib
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
+
+from circuit_breaker import breakers, UpstreamError
+from curated import normalize_title
+from dedupe import dedupe_texts, fit_token_budget
+from external_api import (
+    API_KEY_TMDB, GUARDIAN_SEARCH_URL, TMDB_URL, HTTP_TIMEOUT, is_upstream_failure,
+    guardian_params, parse_guardian_review, parse_guardian_reviews, parse_genres,
+    tmdb_search_params, parse_search_result,
+)
+from title_index import title_index
+
+# Скільки сторінок рецензій TMDb завантажувати (по 20 рецензій на сторінку) і скільки
+# токенів тексту з них віддавати моделям: більше тексту — повільніший аналіз і нижчий рівень
+REVIEW_PAGES = int(os.getenv("TMDB_REVIEW_PAGES", 1))
+REVIEW_TOKEN_BUDGET = int(os.getenv("TMDB_REVIEW_TOKEN_BUDGET", 1024))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+# Режим агрегації: скільки сторінок TMDb і статей Guardian брати, скільки запитів одночасно
+# і скільки токенів тексту максимум віддавати моделям (BART все одно бачить лише 1024)
+AGGREGATE_TMDB_PAGES = int(os.getenv("AGGREGATE_TMDB_PAGES", 5))
+AGGREGATE_GUARDIAN_ARTICLES = int(os.getenv("AGGREGATE_GUARDIAN_ARTICLES", 3))
+AGGREGATE_CONCURRENCY = int(os.getenv("AGGREGATE_CONCURRENCY", 4))
+AGGREGATE_TOKEN_BUDGET = int(os.getenv("AGGREGATE_TOKEN_BUDGET", 1024))
+# Скільки останніх успішних відповідей тримати як запасні на час збою TMDb/Guardian
+FALLBACK_CACHE_SIZE = int(os.getenv("FALLBACK_CACHE_SIZE", 2000))
+# Скільки секунд свіжий результат віддається повторним запитам (прев'ю, а за ним повний аналіз)
+FETCH_REUSE_TTL = float(os.getenv("FETCH_REUSE_TTL", 120))
+
+
+def make_client():
+    return httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+    )
+
+
+class _FallbackCache:
+    """
+    Останні успішні результати: віддаються замість помилки, поки залежність недоступна.
+    """
+
+    def __init__(self, max_size=FALLBACK_CACHE_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key)
+
+
+_fallback_cache = _FallbackCache()
+
+
+class _RecentFetches:
+    """
+    Свіжі результати та запити в польоті: прев'ю і повний аналіз того самого фільму, що йдуть
+    один за одним або одночасно, ходять у TMDb/Guardian один раз.
+
+    Задача, що виконується, спільна лише для викликів з того самого event loop (ASGI-застосунок
+    і фоновий loop синхронного фасаду — різні loop-и), готовий результат — для всіх.
+    """
+
+    def __init__(self, ttl=FETCH_REUSE_TTL, max_size=FALLBACK_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._results = OrderedDict()  # ключ → (результат, час завершення)
+        self._tasks = {}               # (ключ, loop) → задача
+        self._lock = threading.Lock()
+
+    async def get(self, key, fetch):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and time.monotonic() - cached[1] < self.ttl:
+                return cached[0]
+            task = self._tasks.get((key, loop))
+            if task is None:
+                task = self._tasks[(key, loop)] = loop.create_task(fetch())
+                task.add_done_callback(lambda done: self._finish(key, loop, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key, loop, task):
+        with self._lock:
+            self._tasks.pop((key, loop), None)
+            if task.cancelled() or task.exception() is not None or task.result().get('stale'):
+                return
+            self._results[key] = (task.result(), time.monotonic())
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+
+_recent = _RecentFetches()
+
+
+def _stale_or_raise(key, error):
+    cached = _fallback_cache.get(key)
+    if cached is None:
+        raise error
+    print(f"♻️ {error} — віддаємо збережений результат")
+    return dict(cached, stale=True)
+
+
+async def _get_json(client, service, url, params, limit=None):
+    """
+    GET через circuit breaker сервісу.
+    :param limit: asyncio.Semaphore, що обмежує кількість одночасних запитів
+    :raises UpstreamError: сервіс недоступний або breaker розімкнений
+    """
+    async def call():
+        response = await client.get(url, params=params)
+        if is_upstream_failure(response.status_code):
+            raise UpstreamError(service, f"HTTP {response.status_code}")
+        return response
+
+    try:
+        async with limit or contextlib.nullcontext():
+            response = await breakers[service].acall(call)
+    except httpx.HTTPError as e:
+        raise UpstreamError(service, str(e) or type(e).__name__) from e
+    if response.status_code == 200:
+        return response.json()
+    return None
+
+
+async def search_guardian_reviews(client, title, limit=None):
+    data = await _get_json(client, 'guardian', GUARDIAN_SEARCH_URL, guardian_params(title), limit)
+    return parse_guardian_review(data) if data else None
+
+
+async def search_guardian_articles(client, title, count, limit=None):
+    data = await _get_json(client, 'guardian', GUARDIAN_SEARCH_URL, guardian_params(title, page_size=count), limit)
+    return [text for text in parse_guardian_reviews(data) if text] if data else []
+
+
+async def get_movie_id(client, title, limit=None):
+    movie_id = title_index.resolve(title)
+    if movie_id is not None:
+        return movie_id
+    data = await _get_json(client, 'tmdb', f"{TMDB_URL}/search/movie", tmdb_search_params(title), limit)
+    movie = parse_search_result(data) if data else None
+    if not movie:
+        return None
+    title_index.add(title, movie['id'], movie['title'], movie['year'])
+    return movie['id']
+
+
+async def get_movie_genres(client, movie_id, limit=None):
+    params = {"api_key": API_KEY_TMDB, "language": "en-US"}
+    data = await _get_json(client, 'tmdb', f"{TMDB_URL}/movie/{movie_id}", params, limit)
+    return parse_genres(data) if data is not None else None
+
+
+async def get_review_list(client, movie_id, pages=REVIEW_PAGES, limit=None):
+    """
+    Перша сторінка повідомляє total_pages; решта сторінок (до pages) завантажуються паралельно.
+    :return: список рецензій TMDb (словники з полем content)
+    """
+    url = f"{TMDB_URL}/movie/{movie_id}/reviews"
+    params = {"api_key": API_KEY_TMDB, "language": "en-US"}
+    first = await _get_json(client, 'tmdb', url, dict(params, page=1), limit)
+    if not first:
+        return []
+    reviews = list(first.get("results", []))
+    last_page = min(pages, first.get("total_pages") or 1)
+    if last_page > 1:
+        # Додаткові сторінки — не обов'язкові: помилка однієї не скасовує решту
+        rest = await asyncio.gather(
+            *(_get_json(client, 'tmdb', url, dict(params, page=page), limit) for page in range(2, last_page + 1)),
+            return_exceptions=True,
+        )
+        for data in rest:
+            if isinstance(data, dict):
+                reviews.extend(data.get("results", []))
+    return reviews
+
+
+async def get_movie_reviews(client, movie_id, pages=REVIEW_PAGES, token_budget=REVIEW_TOKEN_BUDGET):
+    """
+    :return: об'єднаний текст рецензій у межах token_budget або None
+    """
+    texts = [r['content'] for r in await get_review_list(client, movie_id, pages) if r.get('content')]
+    return "\n".join(fit_token_budget(texts, token_budget)) or None
+
+
+async def fetch_movie(client, title, source='tmdb', pages=REVIEW_PAGES, with_guardian=False):
+    """
+    Усе потрібне для аналізу фільму за мінімальну кількість послідовних round trip-ів.
+    Свіжий результат перевикористовується FETCH_REUSE_TTL секунд; якщо джерело недоступне,
+    повертається останній успішний результат (stale=True).
+    :param with_guardian: для source='tmdb' паралельно отримати ще й рецензію Guardian
+    :return: {'movie_id', 'reviews', 'genres', 'guardian'}
+    :raises UpstreamError: джерело недоступне і збереженого результату немає
+    """
+    key = ('movie', source, normalize_title(title), pages, with_guardian)
+
+    async def fetch():
+        try:
+            movie = await _fetch_movie(client, title, source, pages, with_guardian)
+        except UpstreamError as e:
+            return _stale_or_raise(key, e)
+        _fallback_cache.put(key, movie)
+        return movie
+
+    return await _recent.get(key, fetch)
+
+
+async def _fetch_movie(client, title, source, pages, with_guardian):
+    movie = {'movie_id': None, 'reviews': None, 'genres': None, 'guardian': None}
+    guardian_task = None
+    if source == 'guardian' or with_guardian:
+        guardian_task = asyncio.ensure_future(search_guardian_reviews(client, title))
+    try:
+        if source == 'tmdb':
+            movie['movie_id'] = await get_movie_id(client, title)
+            if movie['movie_id']:
+                movie['reviews'], movie['genres'] = await asyncio.gather(
+                    get_movie_reviews(client, movie['movie_id'], pages),
+                    get_movie_genres(client, movie['movie_id']),
+                )
+        if guardian_task is not None:
+            if source == 'guardian':
+                movie['guardian'] = await guardian_task
+            else:
+                try:
+                    movie['guardian'] = await guardian_task
+                except UpstreamError as e:
+                    print(f"⚠️ Guardian недоступний: {e}")
+    finally:
+        if guardian_task is not None and not guardian_task.done():
+            guardian_task.cancel()
+    return movie
+
+
+async def aggregate_reviews(client, title, pages=AGGREGATE_TMDB_PAGES, articles=AGGREGATE_GUARDIAN_ARTICLES,
+                            token_budget=AGGREGATE_TOKEN_BUDGET, concurrency=AGGREGATE_CONCURRENCY):
+    """
+    Рецензії з кількох сторінок TMDb і кількох статей Guardian: не більше concurrency запитів
+    одночасно, без майже однакових текстів і в межах token_budget.
+    :return: {'movie_id', 'genres', 'text', 'reviews', 'duplicates'}
+    :raises UpstreamError: TMDb недоступний і збереженого результату немає
+    """
+    key = ('aggregate', normalize_title(title), pages, articles, token_budget)
+
+    async def fetch():
+        try:
+            aggregated = await _aggregate_reviews(client, title, pages, articles, token_budget, concurrency)
+        except UpstreamError as e:
+            return _stale_or_raise(key, e)
+        _fallback_cache.put(key, aggregated)
+        return aggregated
+
+    return await _recent.get(key, fetch)
+
+
+async def _aggregate_reviews(client, title, pages, articles, token_budget, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    guardian_task = asyncio.ensure_future(search_guardian_articles(client, title, articles, limit))
+    tmdb, genres = [], None
+    try:
+        movie_id = await get_movie_id(client, title, limit)
+        if movie_id:
+            reviews, genres = await asyncio.gather(
+                get_review_list(client, movie_id, pages, limit),
+                get_movie_genres(client, movie_id, limit),
+            )
+            tmdb = [r['content'] for r in reviews if r.get('content')]
+        try:
+            guardian = await guardian_task
+        except UpstreamError as e:
+            print(f"⚠️ Guardian недоступний: {e}")
+            guardian = []
+    finally:
+        if not guardian_task.done():
+            guardian_task.cancel()
+
+    # Джерела чергуються, щоб бюджет не з'їло одне з них
+    interleaved = [t for pair in itertools.zip_longest(guardian, tmdb) for t in pair if t]
+    texts, duplicates = dedupe_texts(interleaved)
+    selected = fit_token_budget(texts, token_budget)
+    return {
+        'movie_id': movie_id,
+        'genres': genres,
+        'text': "\n\n".join(selected),
+        'reviews': len(selected),
+        'duplicates': duplicates,
+    }
+
+
+class _BackgroundLoop:
+    """
+    Окремий потік з event loop і одним AsyncClient на весь процес (пул з'єднань спільний).
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='external-async', daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    async def _call(self, fn, args):
+        if self._client is None:
+            self._client = make_client()
+        return await fn(self._client, *args)
+
+    def run(self, fn, *args, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(self._call(fn, args), self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+
+_background = _BackgroundLoop()
+
+
+def fetch_movie_sync(title, source='tmdb', pages=REVIEW_PAGES, with_guardian=False, timeout=None):
+    """
+    Синхронний фасад fetch_movie для Flask-маршрутів.
+    :raises TimeoutError: якщо не вклалися в timeout секунд
+    """
+    return _background.run(fetch_movie, title, source, pages, with_guardian, timeout=timeout)
+
+
+def aggregate_reviews_sync(title, timeout=None, **options):
+    """
+    Синхронний фасад aggregate_reviews для Flask-маршрутів.
+    """
+    return _background.run(lambda client: aggregate_reviews(client, title, **options), timeout=timeout)
@@ -0,0 +1,91 @@
+# extractive.py
+"""
+Екстрактивне summary: TextRank над реченнями з TF-IDF-схожістю, векторизовано в NumPy.
+Не потребує моделей і працює за мілісекунди; замість TF-IDF можна передати
+готові ембеддинги речень (напр. MiniLM).
+"""
+import re
+
+import numpy as np
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"[a-zа-яіїєґ']+")
+STOP_WORDS = frozenset(
+    "a an the and or but if of to in on at by for with from as is are was were be been being "
+    "it its this that these those i you he she we they me him her us them my your his our their "
+    "not no so than too very can will just do does did have has had what which who whom "
+    "there here when where why how all any both each few more most other some such only own same".split()
+)
+
+
+def split_sentences(text):
+    """
+    Речення тексту без точних повторів (рецензії часто цитують одна одну).
+    """
+    seen = set()
+    sentences = []
+    for s in _SENTENCE_RE.split(text or ""):
+        s = s.strip()
+        if len(s) > 1 and s.lower() not in seen:
+            seen.add(s.lower())
+            sentences.append(s)
+    return sentences
+
+
+def tfidf_matrix(sentences):
+    """
+    Матриця TF-IDF (речення × слова) з нормованими рядками.
+    """
+    tokenized = [[w for w in _WORD_RE.findall(s.lower()) if w not in STOP_WORDS] for s in sentences]
+    vocab = {}
+    for tokens in tokenized:
+        for w in tokens:
+            vocab.setdefault(w, len(vocab))
+    matrix = np.zeros((len(sentences), max(1, len(vocab))), dtype=np.float32)
+    for i, tokens in enumerate(tokenized):
+        for w in tokens:
+            matrix[i, vocab[w]] += 1.0
+    df = np.count_nonzero(matrix, axis=0)
+    matrix *= np.log((1 + len(sentences)) / (1 + df)) + 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def textrank_scores(vectors, damping=0.85, iterations=50, tol=1e-6):
+    """
+    PageRank над графом косинусної схожості речень.
+    """
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    similarity = np.clip(similarity, 0.0, None)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    row_sums[row_sums == 0] = 1.0
+    transition = similarity / row_sums
+
+    n = len(vectors)
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+
+def extractive_summary(text, max_sentences=5, sentence_vectors=None):
+    """
+    :param sentence_vectors: опційні ембеддинги речень (у порядку split_sentences(text))
+    :return: найважливіші речення в початковому порядку
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences:
+        return ' '.join(sentences)
+    if sentence_vectors is None:
+        vectors = tfidf_matrix(sentences)
+    else:
+        vectors = np.asarray(sentence_vectors, dtype=np.float32)
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    scores = textrank_scores(vectors)
+    top = np.sort(np.argpartition(-scores, max_sentences - 1)[:max_sentences])
+    return ' '.join(sentences[i] for i in top)
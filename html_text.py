@@ -0,0 +1,106 @@
+# html_text.py
+"""
+Потоковий витяг тексту з HTML статей Guardian за один прохід html.parser — без побудови дерева.
+
+Підписи до зображень, вбудовані блоки та «читайте також» відкидаються; текст усередині абзацу
+(разом із посиланнями) лишається одним рядком, абзаци розділяються порожнім рядком.
+"""
+import re
+from html.parser import HTMLParser
+
+# Елементи, весь вміст яких — не текст рецензії
+SKIP_TAGS = frozenset({
+    'figure', 'figcaption', 'aside', 'script', 'style', 'noscript', 'iframe', 'nav', 'footer',
+    'form', 'button', 'svg', 'video', 'audio', 'template',
+})
+# Класи вбудованих блоків Guardian (rich-link, embed, atom тощо) та блоків «related»
+SKIP_CLASS_RE = re.compile(r"rich-link|related|element-embed|element-atom|element-image|submeta|caption")
+BLOCK_TAGS = frozenset({
+    'p', 'div', 'section', 'article', 'header', 'blockquote', 'li', 'ul', 'ol', 'dl', 'dt', 'dd',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'table', 'tr', 'td', 'th', 'br', 'hr',
+})
+VOID_TAGS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr',
+})
+_SPACE_RE = re.compile(r"\s+")
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines = []
+        self._parts = []
+        # Відкриті теги всередині відкинутого блоку (нерозкриті теги не «застрягають»)
+        self._skip_stack = []
+        # Відкриті теги поза відкинутими блоками: закриття одного з них завершує і незакритий
+        # відкинутий блок усередині (<div><figure>…</div>), інакше решта статті загубилась би
+        self._open = []
+
+    def _flush(self):
+        if self._parts:
+            line = _SPACE_RE.sub(' ', ''.join(self._parts)).strip()
+            if line:
+                self.lines.append(line)
+            self._parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag in BLOCK_TAGS and not self._skip_stack:
+                self._flush()
+            return
+        if self._skip_stack:
+            self._skip_stack.append(tag)
+            return
+        self._open.append(tag)
+        css_class = next((value for name, value in attrs if name == 'class'), None)
+        if tag in SKIP_TAGS or (css_class and SKIP_CLASS_RE.search(css_class)):
+            self._flush()
+            self._skip_stack.append(tag)
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS and not self._skip_stack:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if self._skip_stack:
+            if tag in self._skip_stack:
+                while self._skip_stack.pop() != tag:
+                    pass
+                if not self._skip_stack:
+                    self._pop_open(tag)
+                return
+            if tag not in self._open:
+                return
+            self._skip_stack = []
+        self._pop_open(tag)
+        if tag in BLOCK_TAGS:
+            self._flush()
+
+    def _pop_open(self, tag):
+        if tag in self._open:
+            while self._open.pop() != tag:
+                pass
+
+    def handle_data(self, data):
+        if not self._skip_stack:
+            self._parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def html_to_text(html_content):
+    """
+    :return: абзаци тексту, розділені порожнім рядком (як clean_text)
+    """
+    if not html_content:
+        return ""
+    parser = _TextExtractor()
+    parser.feed(html_content)
+    parser.close()
+    return "\n\n".join(parser.lines)
@@ -0,0 +1,95 @@
+# load_monitor.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 'full' — завжди повний конвеєр; 'adaptive' — рівень деградації залежить від навантаження
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "full")
+# Ціль за затримкою живого аналізу (секунди) та «нормальна» кількість аналізів у системі
+# (тих, що виконуються, разом із тими, що чекають у черзі допуску)
+LATENCY_SLO = float(os.getenv("LATENCY_SLO", 10))
+TARGET_IN_FLIGHT = int(os.getenv("TARGET_IN_FLIGHT", 2))
+# За скільки секунд без нових замірів оцінка затримки згасає вдвічі
+LATENCY_HALF_LIFE = float(os.getenv("LATENCY_HALF_LIFE", 30))
+# Межі тиску для переходу на рівні 1, 2, 3; вниз — лише коли тиск на TIER_HYSTERESIS нижчий за межу
+TIER_THRESHOLDS = (1.0, 1.5, 2.5)
+TIER_HYSTERESIS = float(os.getenv("TIER_HYSTERESIS", 0.2))
+
+
+class LoadMonitor:
+    """
+    Стежить за кількістю одночасних аналізів, глибиною черг допуску і ковзною (EWMA)
+    затримкою та обирає рівень деградації конвеєра.
+
+    Оцінка затримки згасає з часом, тож після сплеску простоюючий сервіс повертається
+    до повного конвеєра без нових запитів; гістерезис не дає рівню перемикатися туди-сюди.
+    """
+
+    def __init__(self, slo=LATENCY_SLO, target_in_flight=TARGET_IN_FLIGHT, alpha=0.2,
+                 half_life=LATENCY_HALF_LIFE, hysteresis=TIER_HYSTERESIS, mode=PIPELINE_MODE, clock=time.monotonic):
+        self.slo = slo
+        self.target_in_flight = target_in_flight
+        self.alpha = alpha
+        self.half_life = half_life
+        self.hysteresis = hysteresis
+        self.mode = mode
+        self._clock = clock
+        self._in_flight = 0
+        self._latency = 0.0
+        self._latency_at = clock()
+        self._tier = 0
+        self._queues = []
+        self._lock = threading.Lock()
+
+    def watch_queue(self, depth):
+        """
+        :param depth: функція без аргументів, що повертає кількість запитів у черзі
+        """
+        self._queues.append(depth)
+
+    def _decayed_latency(self, now):
+        if self.half_life <= 0:
+            return self._latency
+        return self._latency * 0.5 ** ((now - self._latency_at) / self.half_life)
+
+    @contextmanager
+    def track(self):
+        with self._lock:
+            self._in_flight += 1
+        started = self._clock()
+        try:
+            yield
+        finally:
+            now = self._clock()
+            with self._lock:
+                self._in_flight -= 1
+                latency = self._decayed_latency(now)
+                self._latency = latency + self.alpha * (now - started - latency)
+                self._latency_at = now
+
+    def pressure(self):
+        queued = sum(depth() for depth in self._queues)
+        with self._lock:
+            return max((self._in_flight + queued) / self.target_in_flight,
+                       self._decayed_latency(self._clock()) / self.slo)
+
+    def tier(self):
+        """
+        0 — повний конвеєр, 1 — greedy, 2 — T5-small без фільтра спойлерів,
+        3 — екстрактивне summary без спойлерів і ключових слів.
+        """
+        if self.mode != 'adaptive':
+            return 0
+        pressure = self.pressure()
+        with self._lock:
+            tier = self._tier
+            while tier < len(TIER_THRESHOLDS) and pressure >= TIER_THRESHOLDS[tier]:
+                tier += 1
+            while tier > 0 and pressure < TIER_THRESHOLDS[tier - 1] - self.hysteresis:
+                tier -= 1
+            self._tier = tier
+            return tier
+
+
+load_monitor = LoadMonitor()
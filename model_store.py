@@ -0,0 +1,155 @@
+# model_store.py
+"""
+Локальний каталог моделей у форматі safetensors.
+
+`prefetch` один раз завантажує всі моделі ai_engine з Hugging Face Hub і зберігає їх
+у MODEL_CACHE_DIR (ваги — safetensors) разом із manifest.json з sha256 кожного файлу.
+`verify` перевіряє, що файли не змінено. Якщо модель є в локальному каталозі,
+ai_engine вантажить її звідти без мережі; safetensors читаються через mmap, тож повторний
+старт бере файли з page cache ОС. Після завантаження кожен процес тримає власну копію ваг;
+спільні між процесами ваги дає лише fork після завантаження (див. bulk_analyze.py).
+
+    python model_store.py prefetch
+    python model_store.py verify
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+MODEL_CACHE_DIR = os.getenv(
+    "MODEL_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+)
+SUMMARIZER_MODEL = os.getenv("SUMMARIZER_MODEL", "facebook/bart-large-cnn")
+
+# Моделі ai_engine: назва на Hub -> тип (визначає класи для збереження)
+MODELS = {
+    SUMMARIZER_MODEL: 'bart',
+    "distilbert-base-uncased-finetuned-sst-2-english": 'sequence-classification',
+    "t5-small": 't5',
+    "sentence-transformers/all-MiniLM-L6-v2": 'sentence-transformer',
+    "philippelaban/keep_it_simple": 'causal-lm',
+    "eesuan/imdb-spoiler-distilbert": 'sequence-classification',
+}
+
+
+def local_path(name):
+    return os.path.join(MODEL_CACHE_DIR, name.replace('/', '__'))
+
+
+def is_local(name):
+    return os.path.exists(os.path.join(local_path(name), 'manifest.json'))
+
+
+def model_source(name):
+    """
+    Шлях до локальної копії, якщо вона є, інакше назва на Hub.
+    """
+    return local_path(name) if is_local(name) else name
+
+
+def model_load_kwargs(name):
+    """
+    Параметри from_pretrained для моделі (не токенізатора).
+    """
+    if not is_local(name):
+        return {}
+    return {'local_files_only': True, 'use_safetensors': True, 'low_cpu_mem_usage': True}
+
+
+def _classes(kind):
+    from transformers import (
+        AutoTokenizer, AutoModelForCausalLM, AutoModelForSequenceClassification,
+        BartTokenizer, BartForConditionalGeneration, T5Tokenizer, T5ForConditionalGeneration
+    )
+    return {
+        'bart': (BartTokenizer, BartForConditionalGeneration),
+        't5': (T5Tokenizer, T5ForConditionalGeneration),
+        'sequence-classification': (AutoTokenizer, AutoModelForSequenceClassification),
+        'causal-lm': (AutoTokenizer, AutoModelForCausalLM),
+    }[kind]
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _files(directory):
+    for root, _, names in os.walk(directory):
+        for file_name in names:
+            if file_name != 'manifest.json':
+                path = os.path.join(root, file_name)
+                yield os.path.relpath(path, directory), path
+
+
+def prefetch(name, kind):
+    target = local_path(name)
+    os.makedirs(target, exist_ok=True)
+    if kind == 'sentence-transformer':
+        from sentence_transformers import SentenceTransformer
+        SentenceTransformer(name).save(target, safe_serialization=True)
+    else:
+        tokenizer_cls, model_cls = _classes(kind)
+        tokenizer_cls.from_pretrained(name).save_pretrained(target)
+        model_cls.from_pretrained(name).save_pretrained(target, safe_serialization=True)
+
+    manifest = {
+        'model': name,
+        'kind': kind,
+        'files': {rel: {'sha256': _sha256(path), 'size': os.path.getsize(path)} for rel, path in _files(target)},
+    }
+    with open(os.path.join(target, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"✅ {name} → {target}")
+
+
+def verify(name):
+    """
+    :return: список проблем (порожній, якщо все гаразд)
+    """
+    target = local_path(name)
+    if not is_local(name):
+        return [f"{name}: немає в {MODEL_CACHE_DIR}"]
+    with open(os.path.join(target, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    problems = []
+    for rel, info in manifest['files'].items():
+        path = os.path.join(target, rel)
+        if not os.path.exists(path):
+            problems.append(f"{name}: бракує {rel}")
+        elif os.path.getsize(path) != info['size'] or _sha256(path) != info['sha256']:
+            problems.append(f"{name}: змінено {rel}")
+    if not any(rel.endswith('.safetensors') for rel in manifest['files']):
+        problems.append(f"{name}: немає ваг у форматі safetensors")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local safetensors model directory")
+    parser.add_argument('command', choices=['prefetch', 'verify'])
+    parser.add_argument('--force', action='store_true', help="re-download models that are already present")
+    args = parser.parse_args()
+
+    if args.command == 'prefetch':
+        for name, kind in MODELS.items():
+            if is_local(name) and not args.force:
+                print(f"⏭️ {name} вже є")
+                continue
+            prefetch(name, kind)
+
+    problems = [p for name in MODELS for p in verify(name)]
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"✅ Усі моделі на місці: {MODEL_CACHE_DIR}")
+
+
+if __name__ == '__main__':
+    main()
@@ -18,4 +18,4 @@ class SearchHistory(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     movie_title = db.Column(db.String(200))
     genres = db.Column(db.String(200))
-    timestamp = db.Column(db.DateTime, default=datetime.datetime.now())
+    timestamp = db.Column(db.DateTime, default=datetime.datetime.now)
@@ -0,0 +1,240 @@
+# rate_limit.py
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Ліміти: запитів на хвилину та розмір «пачки» (burst) для користувача та IP
+RATE_USER_PER_MIN = float(os.getenv("RATE_USER_PER_MIN", 10))
+RATE_USER_BURST = float(os.getenv("RATE_USER_BURST", 5))
+RATE_IP_PER_MIN = float(os.getenv("RATE_IP_PER_MIN", 30))
+RATE_IP_BURST = float(os.getenv("RATE_IP_BURST", 10))
+# Екстрактивні прев'ю мають окремий, щедріший ліміт і не витрачають ліміт аналізів
+RATE_PREVIEW_PER_MIN = float(os.getenv("RATE_PREVIEW_PER_MIN", 30))
+RATE_PREVIEW_BURST = float(os.getenv("RATE_PREVIEW_BURST", 10))
+# Глобальний ліміт живих аналізів і черга очікування
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", 4))
+MAX_QUEUE = int(os.getenv("MAX_QUEUE", 16))
+QUEUE_TIMEOUT = float(os.getenv("QUEUE_TIMEOUT", 10))
+# Спільне сховище лімітів для кількох процесів (опційно, потрібен пакет redis)
+REDIS_URL = os.getenv("REDIS_URL")
+
+
+class MemoryBucketStore:
+    """
+    Token bucket у пам'яті процесу.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """
+        :param rate: поповнення, токенів за секунду
+        :return: (allowed, retry_after_seconds)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                allowed, retry_after = True, 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, retry_after = False, (1 - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now):
+        # Відра, що простояли понад годину, давно повні — їх можна створити заново
+        for key in [k for k, (_, last) in self._buckets.items() if now - last > 3600]:
+            del self._buckets[key]
+
+
+_REDIS_TAKE = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or ARGV[2])
+local last = tonumber(redis.call('HGET', KEYS[1], 'ts') or ARGV[3])
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+local allowed, retry = 0, 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+else
+  retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry)}
+"""
+
+
+class RedisBucketStore:
+    """
+    Token bucket у Redis (атомарно через Lua) — ліміти спільні для всіх процесів.
+    Поки Redis недоступний, ліміти рахуються в пам'яті процесу.
+    """
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(_REDIS_TAKE)
+        self._redis_error = redis.RedisError
+        self._fallback = MemoryBucketStore()
+        self._degraded = False
+
+    def take(self, key, rate, burst):
+        try:
+            allowed, retry_after = self._take(keys=[f"cinemind:rl:{key}"], args=[rate, burst, time.time()])
+        except self._redis_error as e:
+            if not self._degraded:
+                self._degraded = True
+                print(f"⚠️ Redis недоступний ({e}) — ліміти тимчасово лише в пам'яті процесу")
+            return self._fallback.take(key, rate, burst)
+        if self._degraded:
+            self._degraded = False
+            print("✅ Redis знову доступний — ліміти спільні для всіх процесів")
+        return bool(int(allowed)), float(retry_after)
+
+
+def make_store():
+    if REDIS_URL:
+        try:
+            return RedisBucketStore(REDIS_URL)
+        except ImportError:
+            print("⚠️ REDIS_URL задано, але пакет redis не встановлено — ліміти лише в пам'яті процесу")
+    return MemoryBucketStore()
+
+
+def _user_key(user_id):
+    # userId приходить і числом, і рядком: 5 та "5" — один користувач
+    user_id = str(user_id).strip()
+    return f"user:{int(user_id)}" if user_id.isdigit() else f"user:{user_id}"
+
+
+class RateLimiter:
+    def __init__(self, store=None):
+        self.store = store or make_store()
+
+    def check(self, user_id=None, ip=None, preview=False):
+        """
+        :param preview: запит екстрактивного прев'ю — рахується в окремих відрах
+        :return: 0, якщо запит дозволено, інакше через скільки секунд повторити
+        """
+        limits = []
+        if preview:
+            rate, burst = RATE_PREVIEW_PER_MIN / 60, RATE_PREVIEW_BURST
+            if user_id is not None:
+                limits.append(("preview:" + _user_key(user_id), rate, burst))
+            if ip:
+                limits.append((f"preview:ip:{ip}", rate, burst))
+        else:
+            if user_id is not None:
+                limits.append((_user_key(user_id), RATE_USER_PER_MIN / 60, RATE_USER_BURST))
+            if ip:
+                limits.append((f"ip:{ip}", RATE_IP_PER_MIN / 60, RATE_IP_BURST))
+        for key, rate, burst in limits:
+            allowed, retry_after = self.store.take(key, rate, burst)
+            if not allowed:
+                return max(1, math.ceil(retry_after))
+        return 0
+
+
+class AdmissionController:
+    """
+    Глобальний ліміт одночасних аналізів з обмеженою чергою очікування.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """
+        :return: True, якщо слот отримано; False — черга переповнена або час очікування вичерпано
+        """
+        with self._cond:
+            if self._in_flight < self.max_in_flight:
+                self._in_flight += 1
+                return True
+            if self._waiting >= self.max_queue:
+                return False
+            self._waiting += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self._in_flight < self.max_in_flight,
+                                               timeout=self.queue_timeout)
+            finally:
+                self._waiting -= 1
+            if admitted:
+                self._in_flight += 1
+            return admitted
+
+    def waiting(self):
+        return self._waiting
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+
+class AsyncAdmissionController:
+    """
+    AdmissionController для asyncio: очікування в черзі не займає потік.
+
+    release() синхронний: його можна викликати з done-callback через call_soon_threadsafe.
+    Звільнений слот одразу передається першому в черзі.
+    """
+
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiters = deque()
+
+    async def acquire(self):
+        """
+        :return: True, якщо слот отримано; False — черга переповнена або час очікування вичерпано
+        """
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+        slot = asyncio.get_running_loop().create_future()
+        self._waiters.append(slot)
+        try:
+            await asyncio.wait_for(slot, timeout=self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return slot.done() and not slot.cancelled()
+        except asyncio.CancelledError:
+            # Слот могли передати саме перед скасуванням — повертаємо його
+            if slot.done() and not slot.cancelled():
+                self.release()
+            raise
+        finally:
+            if slot in self._waiters:
+                self._waiters.remove(slot)
+
+    def waiting(self):
+        return len(self._waiters)
+
+    def release(self):
+        while self._waiters:
+            slot = self._waiters.popleft()
+            if not slot.done():
+                slot.set_result(True)
+                return
+        self._in_flight -= 1
@@ -0,0 +1,166 @@
+# recommender.py
+import heapq
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+
+RECO_HALF_LIFE_DAYS = float(os.getenv("RECO_HALF_LIFE_DAYS", 30))
+RECO_HISTORY_WINDOW = int(os.getenv("RECO_HISTORY_WINDOW", 50))
+RECO_COOC_WEIGHT = float(os.getenv("RECO_COOC_WEIGHT", 0.5))
+
+# Записи, які не є реальними фільмами
+SKIP_TITLES = {"", "Custom Review"}
+
+
+def split_genres(genres):
+    if not genres:
+        return []
+    if isinstance(genres, str):
+        genres = genres.split(',')
+    return [g.strip() for g in genres if g and g.strip()]
+
+
+class Recommender:
+    """
+    Жанрові рекомендації за SearchHistory.
+
+    Тримає дві розріджені матриці (dict of dicts), що оновлюються інкрементально з кожним
+    новим рядком історії:
+      - user × genre — вага жанру для користувача з експоненційним згасанням у часі;
+      - title × title — co-occurrence фільмів в історіях одних і тих самих користувачів.
+    Згасання реалізовано через зростаючу вагу нових подій відносно t0,
+    тому старі значення не треба перераховувати.
+    """
+
+    def __init__(self, half_life_days=RECO_HALF_LIFE_DAYS, history_window=RECO_HISTORY_WINDOW):
+        self._decay = math.log(2) / (half_life_days * 86400)
+        self._t0 = time.time()
+        self.history_window = history_window
+        self.loaded = False
+        # Найбільший id рядка історії, що потрапив у первинну побудову
+        self._loaded_upto = 0
+
+        self._user_genre = defaultdict(lambda: defaultdict(float))
+        self._user_titles = defaultdict(dict)
+        self._genre_titles = defaultdict(lambda: defaultdict(float))
+        self._cooc = defaultdict(lambda: defaultdict(float))
+        self._title_genres = {}
+        # Кеш топ-фільмів по жанру; скидається, коли жанр отримує нову подію
+        self._genre_top = {}
+        self._lock = threading.RLock()
+
+    def _weight(self, ts):
+        if ts is None:
+            ts = time.time()
+        elif hasattr(ts, 'timestamp'):
+            ts = ts.timestamp()
+        return math.exp(self._decay * (ts - self._t0))
+
+    def record(self, user_id, movie_title, genres, timestamp=None):
+        """
+        Інкрементально додає один рядок історії до обох матриць.
+        """
+        if user_id is None or movie_title in SKIP_TITLES:
+            return
+        genres = split_genres(genres)
+        w = self._weight(timestamp)
+
+        with self._lock:
+            for g in genres:
+                self._user_genre[user_id][g] += w
+                self._genre_titles[g][movie_title] += w
+                self._genre_top.pop(g, None)
+            if genres:
+                self._title_genres[movie_title] = genres
+
+            seen = self._user_titles[user_id]
+            for other in seen:
+                if other != movie_title:
+                    self._cooc[movie_title][other] += 1
+                    self._cooc[other][movie_title] += 1
+            seen.pop(movie_title, None)
+            seen[movie_title] = w
+            # Обмежуємо вікно історії, щоб оновлення co-occurrence було O(window)
+            while len(seen) > self.history_window:
+                del seen[next(iter(seen))]
+
+    def load(self, fetch_rows):
+        """
+        Первинна побудова, рівно один раз навіть при одночасних викликах.
+        Поки рядки читаються і додаються, record_row чекає на замок, тож рядок історії
+        не пропадає і не рахується двічі.
+        :param fetch_rows: функція, що повертає рядки SearchHistory
+                           (id, user_id, movie_title, genres, timestamp) за зростанням id
+        :return: кількість рядків або None, якщо індекс уже побудовано
+        """
+        with self._lock:
+            if self.loaded:
+                return None
+            rows = fetch_rows()
+            for row_id, user_id, movie_title, genres, timestamp in rows:
+                self.record(user_id, movie_title, genres, timestamp)
+                self._loaded_upto = max(self._loaded_upto, row_id)
+            self.loaded = True
+            return len(rows)
+
+    def record_row(self, row_id, user_id, movie_title, genres, timestamp=None):
+        """
+        Новий рядок історії; ігнорується, якщо індекс ще не побудовано або рядок уже в ньому.
+        """
+        with self._lock:
+            if self.loaded and row_id > self._loaded_upto:
+                self.record(user_id, movie_title, genres, timestamp)
+
+    def _top_titles_for_genre(self, genre, k=50):
+        top = self._genre_top.get(genre)
+        if top is None:
+            titles = self._genre_titles.get(genre, {})
+            top = heapq.nlargest(k, titles.items(), key=lambda kv: kv[1])
+            self._genre_top[genre] = top
+        return top
+
+    def recommend(self, user_id, n=10, fallback_genres=None):
+        """
+        Топ-N фільмів для користувача.
+        :param fallback_genres: жанри профілю, якщо історії ще немає
+        :return: список словників {'title', 'score', 'genres'}
+        """
+        with self._lock:
+            profile = dict(self._user_genre.get(user_id, {}))
+            if not profile:
+                profile = {g: 1.0 for g in split_genres(fallback_genres)}
+            seen = dict(self._user_titles.get(user_id, {}))
+
+            scores = defaultdict(float)
+
+            total = sum(profile.values()) or 1.0
+            for genre, gw in heapq.nlargest(5, profile.items(), key=lambda kv: kv[1]):
+                top = self._top_titles_for_genre(genre)
+                if not top:
+                    continue
+                best = top[0][1] or 1.0
+                for title, pop in top:
+                    scores[title] += (gw / total) * (pop / best)
+
+            seen_total = sum(seen.values()) or 1.0
+            for title, tw in seen.items():
+                neighbours = self._cooc.get(title)
+                if not neighbours:
+                    continue
+                best = max(neighbours.values())
+                for other, count in neighbours.items():
+                    scores[other] += RECO_COOC_WEIGHT * (tw / seen_total) * (count / best)
+
+            for title in seen:
+                scores.pop(title, None)
+
+            top = heapq.nlargest(n, scores.items(), key=lambda kv: kv[1])
+            return [
+                {'title': title, 'score': round(score, 4), 'genres': self._title_genres.get(title, [])}
+                for title, score in top
+            ]
+
+
+recommender = Recommender()
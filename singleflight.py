@@ -0,0 +1,106 @@
+# singleflight.py
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Об'єднання однакових запитів, що виконуються одночасно.
+
+    Перший виклик з ключем виконує fn(), решта викликів з тим самим ключем
+    чекають на нього та отримують той самий результат (або той самий виняток).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        :return: (результат, shared) — shared=True, якщо результат отримано від іншого виклику
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+            if call.waiters:
+                print(f"🔗 Запит об'єднано з {call.waiters} ідентичними: {key}")
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight для asyncio: fn() виконується однією задачею, на яку чекають усі ідентичні запити.
+
+    Якщо всі, хто чекав, скасовані (наприклад, клієнти відключилися), задача теж скасовується
+    і одразу забирається з _calls — наступний ідентичний запит запускає її заново.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn):
+        """
+        :param fn: функція без аргументів, що повертає корутину
+        :return: (результат, shared)
+        """
+        while True:
+            call = self._calls.get(key)
+            shared = call is not None
+            if call is None:
+                call = self._calls[key] = {'task': asyncio.ensure_future(fn()), 'waiters': 0}
+                call['task'].add_done_callback(lambda _, call=call: self._forget(key, call))
+            call['waiters'] += 1
+            try:
+                return await asyncio.shield(call['task']), shared
+            except asyncio.CancelledError:
+                # Спільну задачу скасував хтось інший, а цей запит ще чекає — запускаємо заново
+                if call['task'].cancelled() and not asyncio.current_task().cancelling():
+                    self._forget(key, call)
+                    continue
+                raise
+            finally:
+                call['waiters'] -= 1
+                if not call['waiters'] and not call['task'].done():
+                    call['task'].cancel()
+                    self._forget(key, call)
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self):
+        return len(self._calls)
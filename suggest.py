@@ -0,0 +1,107 @@
+# suggest.py
+import bisect
+import heapq
+import os
+import threading
+
+from curated import normalize_title
+
+# Префікси до стількох символів мають тисячі збігів: їх рейтинг рахується раз і кешується
+SUGGEST_SHORT_PREFIX = int(os.getenv("SUGGEST_SHORT_PREFIX", 2))
+SUGGEST_CACHED_TOP = int(os.getenv("SUGGEST_CACHED_TOP", 50))
+
+
+class PrefixIndex:
+    """
+    Підказки назв фільмів за префіксом: відсортований масив ключів + bisect.
+
+    Кожна назва індексується з початку кожного слова ('dark knight', 'knight' для
+    'The Dark Knight'), тож підказка знаходиться і за словом усередині назви.
+    Нові назви вставляються на місце без перебудови масиву. Ранжується весь діапазон
+    збігів префікса, інакше популярна назва далі за алфавітом не потрапила б у підказки;
+    для коротких префіксів готовий рейтинг береться з кешу, який скидається лише для
+    префіксів змінених назв.
+    """
+
+    def __init__(self, short_prefix=SUGGEST_SHORT_PREFIX, cached_top=SUGGEST_CACHED_TOP):
+        self.short_prefix = short_prefix
+        self.cached_top = cached_top
+        self._short = {}     # короткий префікс → відранжовані нормалізовані назви
+        self._entries = []   # відсортовані (ключ, нормалізована назва)
+        self._titles = {}    # нормалізована назва → назва для показу
+        self._weights = {}   # нормалізована назва → популярність
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._titles)
+
+    def add(self, title, weight=1):
+        """
+        Додає назву або збільшує її вагу, якщо вона вже є.
+        """
+        norm = normalize_title(title)
+        if not norm:
+            return
+        with self._lock:
+            words = norm.split(' ')
+            for i in range(len(words)):
+                key = ' '.join(words[i:])
+                for n in range(1, self.short_prefix + 1):
+                    self._short.pop(key[:n], None)
+            if norm in self._titles:
+                self._weights[norm] += weight
+                return
+            self._titles[norm] = title
+            self._weights[norm] = weight
+            for i in range(len(words)):
+                bisect.insort(self._entries, (' '.join(words[i:]), norm))
+
+    def load(self, weighted_titles):
+        """
+        Первинна побудова з пар (назва, вага); перші назви мають пріоритет у написанні.
+        """
+        with self._lock:
+            if self.loaded:
+                return
+            for title, weight in weighted_titles:
+                norm = normalize_title(title)
+                if not norm:
+                    continue
+                if norm in self._titles:
+                    self._weights[norm] += weight
+                    continue
+                self._titles[norm] = title
+                self._weights[norm] = weight
+                words = norm.split(' ')
+                self._entries.extend((' '.join(words[i:]), norm) for i in range(len(words)))
+            self._entries.sort()
+            self._short.clear()
+            self.loaded = True
+
+    def suggest(self, prefix, limit=10):
+        """
+        :return: до limit назв; спершу ті, що починаються з префікса, далі — за популярністю
+        """
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            short = len(prefix) <= self.short_prefix and limit <= self.cached_top
+            ranked = self._short.get(prefix) if short else None
+            if ranked is None:
+                ranked = self._rank(prefix, self.cached_top if short else limit)
+                if short:
+                    self._short[prefix] = ranked
+            return [self._titles[n] for n in ranked[:limit]]
+
+    def _rank(self, prefix, limit):
+        start = bisect.bisect_left(self._entries, (prefix,))
+        end = bisect.bisect_left(self._entries, (prefix + '\U0010ffff',), start)
+        matches = {}
+        for key, norm in self._entries[start:end]:
+            matches[norm] = matches.get(norm, False) or norm.startswith(prefix)
+        return heapq.nsmallest(limit, matches, key=lambda n: (not matches[n], -self._weights[n], len(n)))
+
+
+suggest_index = PrefixIndex()
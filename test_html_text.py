@@ -0,0 +1,28 @@
+# test_html_text.py
+from html_text import html_to_text
+
+
+def test_paragraphs_and_inline_links():
+    html = '<p>First <a href="#">linked</a> line.</p><p>Second.</p>'
+    assert html_to_text(html) == "First linked line.\n\nSecond."
+
+
+def test_skipped_blocks_are_dropped():
+    html = ('<p>Before.</p><figure><img src="x"><figcaption>Caption</figcaption></figure>'
+            '<aside class="element-rich-link"><p>Related</p></aside><p>After.</p>')
+    assert html_to_text(html) == "Before.\n\nAfter."
+
+
+def test_unclosed_skip_tag_ends_with_enclosing_block():
+    html = '<div><figure>no close</div><p>after</p>'
+    assert html_to_text(html) == "after"
+
+
+def test_unclosed_tags_inside_skip_block():
+    html = '<p>one</p><aside><div><span>junk</aside><p>two</p>'
+    assert html_to_text(html) == "one\n\ntwo"
+
+
+def test_stray_end_tags_are_ignored():
+    html = '</div></span><p>text</p></p></figure><p>more</p>'
+    assert html_to_text(html) == "text\n\nmore"
@@ -0,0 +1,63 @@
+# test_load_monitor.py
+from load_monitor import LoadMonitor
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_monitor(clock, queue=None):
+    monitor = LoadMonitor(slo=10, target_in_flight=2, alpha=1.0, half_life=30, hysteresis=0.2,
+                          mode='adaptive', clock=clock)
+    if queue is not None:
+        monitor.watch_queue(lambda: queue[0])
+    return monitor
+
+
+def slow_request(monitor, clock, seconds):
+    with monitor.track():
+        clock.now += seconds
+
+
+def test_full_mode_never_degrades():
+    clock = Clock()
+    monitor = LoadMonitor(mode='full', clock=clock)
+    slow_request(monitor, clock, 100)
+    assert monitor.tier() == 0
+
+
+def test_queue_depth_raises_tier():
+    clock = Clock()
+    queue = [0]
+    monitor = make_monitor(clock, queue)
+    assert monitor.tier() == 0
+    queue[0] = 2
+    assert monitor.tier() == 1
+    queue[0] = 5
+    assert monitor.tier() == 3
+
+
+def test_latency_decays_while_idle():
+    clock = Clock()
+    monitor = make_monitor(clock)
+    slow_request(monitor, clock, 30)
+    assert monitor.tier() == 3
+    clock.now += 30
+    assert monitor.tier() == 2
+    clock.now += 120
+    assert monitor.tier() == 0
+
+
+def test_hysteresis_keeps_tier_near_threshold():
+    clock = Clock()
+    queue = [3]
+    monitor = make_monitor(clock, queue)
+    assert monitor.tier() == 2
+    queue[0] = 2.8
+    assert monitor.tier() == 2
+    queue[0] = 2.5
+    assert monitor.tier() == 1
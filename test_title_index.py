@@ -0,0 +1,50 @@
+# test_title_index.py
+from title_index import TitleIndex
+
+
+def make_index(tmp_path):
+    index = TitleIndex(path=str(tmp_path / 'title_index.json'), flush_every=10_000)
+    index.add('rocky', 1366, 'Rocky', 1976)
+    index.add('frozen', 109445, 'Frozen', 2013)
+    index.add('the godfather', 238, 'The Godfather', 1972)
+    return index
+
+
+def test_typo_resolves_to_known_title(tmp_path):
+    index = make_index(tmp_path)
+    assert index.resolve('the godfater') == 238
+    assert index.resolve('Frozen') == 109445
+
+
+def test_sequel_does_not_match_original(tmp_path):
+    index = make_index(tmp_path)
+    assert index.resolve('rocky ii') is None
+    assert index.resolve('Frozen II') is None
+    assert index.resolve('frozen 2') is None
+    assert index.resolve('the godfather part ii') is None
+
+
+def test_original_does_not_match_sequel(tmp_path):
+    index = make_index(tmp_path)
+    index.add('frozen ii', 330457, 'Frozen II', 2019)
+    index.add('the godfather part ii', 240, 'The Godfather Part II', 1974)
+    assert index.resolve('frozen ii') == 330457
+    assert index.resolve('frozen') == 109445
+    assert index.resolve('the godfater part ii') == 240
+    assert index.resolve('the godfater') == 238
+
+
+def test_index_survives_reload(tmp_path):
+    index = make_index(tmp_path)
+    index.flush()
+    reloaded = TitleIndex(path=index.path)
+    assert reloaded.resolve('Rocky (1976)') == 1366
+    assert reloaded.movie(238) == {'title': 'The Godfather', 'year': 1972}
+
+
+def test_add_flushes_in_background(tmp_path):
+    index = TitleIndex(path=str(tmp_path / 'title_index.json'), flush_every=2)
+    index.add('rocky', 1366, 'Rocky', 1976)
+    index.add('frozen', 109445, 'Frozen', 2013)
+    index._flusher.join()
+    assert TitleIndex(path=index.path).resolve('rocky') == 1366
@@ -0,0 +1,28 @@
+# test_user_cache.py
+from user_cache import UserProfileCache
+
+
+def test_invalidate_during_load_is_not_cached():
+    cache = UserProfileCache()
+    rows = {1: 'old'}
+
+    def racing_loader(user_id):
+        value = rows[user_id]
+        # Запис і invalidate відбуваються, поки читання ще триває
+        rows[user_id] = 'new'
+        cache.invalidate(user_id)
+        return {'id': user_id, 'username': value}
+
+    assert cache.get(1, racing_loader)['username'] == 'old'
+    assert cache.get(1, lambda user_id: {'id': user_id, 'username': rows[user_id]})['username'] == 'new'
+
+
+def test_clear_during_load_is_not_cached():
+    cache = UserProfileCache()
+
+    def racing_loader(user_id):
+        cache.clear()
+        return {'id': user_id, 'username': 'old'}
+
+    cache.get(1, racing_loader)
+    assert cache.get(1, lambda user_id: {'id': user_id, 'username': 'new'})['username'] == 'new'
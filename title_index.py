@@ -0,0 +1,249 @@
+# title_index.py
+"""
+Локальний індекс «назва (+ рік) → TMDb ID», щоб не шукати в TMDb фільми, які вже знаходили.
+
+Точні збіги — хеш-таблиця за нормалізованою назвою та роком; опечатки ловить триграмний
+індекс (коефіцієнт Дайса). Нові відповідності додаються після кожного пошуку в TMDb і
+періодично зберігаються в JSON. Первинне наповнення з SearchHistory:
+
+    python title_index.py seed --limit 1000
+"""
+import argparse
+import atexit
+import json
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from curated import normalize_title
+
+TITLE_INDEX_PATH = os.getenv(
+    "TITLE_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'title_index.json')
+)
+# Мінімальна схожість триграм для нечіткого збігу; номери частин у назвах мають збігатися точно
+TITLE_FUZZY_THRESHOLD = float(os.getenv("TITLE_FUZZY_THRESHOLD", 0.8))
+TITLE_FLUSH_EVERY = int(os.getenv("TITLE_FLUSH_EVERY", 20))
+
+# Рік лише в дужках: 'Blade Runner 2049' чи '1917' — це назви, а не роки
+_YEAR_RE = re.compile(r"^(.*?)\s*[(\[]((?:18|19|20)\d\d)[)\]]\s*$")
+
+
+def parse_year(title):
+    """
+    'Dune (2021)' → ('Dune', 2021); 'Dune' → ('Dune', None).
+    """
+    match = _YEAR_RE.match(title or "")
+    if match and match.group(1).strip():
+        return match.group(1).strip(), int(match.group(2))
+    return title, None
+
+
+def split_year(title):
+    """
+    Нормалізована назва та рік: 'Dune (2021)' → ('dune', 2021).
+    """
+    title, year = parse_year(title)
+    return normalize_title(title), year
+
+
+def trigrams(norm):
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Римські цифри та числівники в назвах сиквелів: 'Rocky II' = 'Rocky 2' ≠ 'Rocky'
+_ROMAN = {r: str(i) for i, r in enumerate(
+    ('ii', 'iii', 'iv', 'v', 'vi', 'vii', 'viii', 'ix', 'x', 'xi', 'xii', 'xiii', 'xiv', 'xv'), start=2)}
+_NUMBER_WORDS = {w: str(i) for i, w in enumerate(
+    ('two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten'), start=2)}
+_SEQUEL_WORDS = {'part', 'chapter', 'episode', 'vol', 'volume'}
+
+
+def _numbers(norm):
+    """
+    Ознаки номера частини: цифри, римські цифри та числівники (зведені до цифр) і слова
+    на кшталт 'part' — у нечіткого збігу вони мають збігатися точно.
+    """
+    markers = set()
+    for w in norm.split():
+        if w.isdigit():
+            markers.add(str(int(w)))
+        elif w in _ROMAN:
+            markers.add(_ROMAN[w])
+        elif w in _NUMBER_WORDS:
+            markers.add(_NUMBER_WORDS[w])
+        elif w in _SEQUEL_WORDS:
+            markers.add(w)
+    return markers
+
+
+class TitleIndex:
+    def __init__(self, path=TITLE_INDEX_PATH, fuzzy_threshold=TITLE_FUZZY_THRESHOLD, flush_every=TITLE_FLUSH_EVERY):
+        self.path = path
+        self.fuzzy_threshold = fuzzy_threshold
+        self.flush_every = flush_every
+        self._ids = {}       # (нормалізована назва, рік або None) → TMDb ID
+        self._movies = {}    # TMDb ID → {'title', 'year'}
+        self._grams = defaultdict(set)  # триграма → нормалізовані назви
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flusher = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"❌ Не вдалося прочитати {self.path}: {e}")
+            return
+        self._movies = {int(movie_id): movie for movie_id, movie in data.get('movies', {}).items()}
+        for norm, year, movie_id in data.get('keys', []):
+            self._put(norm, year, movie_id)
+        self._dirty = 0
+
+    def _put(self, norm, year, movie_id):
+        if (norm, year) not in self._ids:
+            self._dirty += 1
+        self._ids[(norm, year)] = movie_id
+        for gram in trigrams(norm):
+            self._grams[gram].add(norm)
+
+    def __len__(self):
+        return len(self._movies)
+
+    def add(self, query, movie_id, title=None, year=None):
+        """
+        Запам'ятовує, що запит query (і канонічна назва title з TMDb) відповідає movie_id.
+        """
+        query_norm, query_year = split_year(query)
+        with self._lock:
+            if query_norm:
+                self._put(query_norm, query_year, movie_id)
+            if title:
+                self._movies[movie_id] = {'title': title, 'year': year}
+                norm = normalize_title(title)
+                self._put(norm, year, movie_id)
+                # Без року назва веде до першого знайденого фільму (TMDb сортує за популярністю)
+                if (norm, None) not in self._ids:
+                    self._put(norm, None, movie_id)
+            elif movie_id not in self._movies:
+                self._movies[movie_id] = {'title': query, 'year': query_year}
+            should_flush = self._dirty >= self.flush_every and not (self._flusher and self._flusher.is_alive())
+            if should_flush:
+                # Запис JSON — у фоновому потоці: add викликається і з event loop ASGI
+                self._flusher = threading.Thread(target=self.flush, name='title-index-flush', daemon=True)
+                self._flusher.start()
+
+    def resolve(self, title):
+        """
+        :return: TMDb ID або None, якщо назви немає в індексі навіть приблизно
+        """
+        norm, year = split_year(title)
+        if not norm:
+            return None
+        with self._lock:
+            movie_id = self._ids.get((norm, year))
+            if movie_id is not None:
+                return movie_id
+            match = self._fuzzy(norm, year)
+            return self._ids.get((match, year)) if match else None
+
+    def _fuzzy(self, norm, year):
+        grams = trigrams(norm)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        numbers = _numbers(norm)
+        best, best_score = None, self.fuzzy_threshold
+        for candidate, count in shared.most_common(50):
+            score = 2 * count / (len(grams) + len(trigrams(candidate)))
+            if score >= best_score and (candidate, year) in self._ids and _numbers(candidate) == numbers:
+                best, best_score = candidate, score
+        return best
+
+    def movie(self, movie_id):
+        with self._lock:
+            return self._movies.get(movie_id)
+
+    def titles(self):
+        """
+        Канонічні назви всіх відомих фільмів (для підказок).
+        """
+        with self._lock:
+            return [movie['title'] for movie in self._movies.values()]
+
+    def flush(self):
+        # Знімок і запис під одним _write_lock: пізніший знімок завжди записується останнім
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {
+                    'movies': {str(movie_id): movie for movie_id, movie in self._movies.items()},
+                    'keys': [[norm, year, movie_id] for (norm, year), movie_id in self._ids.items()],
+                }
+                self._dirty = 0
+            # Серіалізація поза основним замком, щоб не блокувати resolve
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+
+title_index = TitleIndex()
+atexit.register(title_index.flush)
+
+
+def seed_from_history(limit):
+    """
+    Розв'язує через TMDb найчастіші назви з SearchHistory, яких ще немає в індексі.
+    """
+    from flask import Flask
+
+    from external_api import search_movie
+    from models import db, SearchHistory
+    from recommender import SKIP_TITLES
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        rows = db.session.query(SearchHistory.movie_title, db.func.count(SearchHistory.id).label('n')) \
+            .group_by(SearchHistory.movie_title).order_by(db.desc('n')).limit(limit).all()
+
+    added = 0
+    for movie_title, _ in rows:
+        if not movie_title or movie_title in SKIP_TITLES or title_index.resolve(movie_title):
+            continue
+        movie = search_movie(movie_title)
+        if movie:
+            title_index.add(movie_title, movie['id'], movie['title'], movie['year'])
+            added += 1
+    title_index.flush()
+    print(f"📇 Додано {added} фільмів, в індексі {len(title_index)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local title → TMDb id index")
+    sub = parser.add_subparsers(dest='command', required=True)
+    seed = sub.add_parser('seed', help="resolve the most searched SearchHistory titles through TMDb")
+    seed.add_argument('--limit', type=int, default=1000)
+    sub.add_parser('stats', help="print index size")
+    args = parser.parse_args()
+
+    if args.command == 'seed':
+        seed_from_history(args.limit)
+    else:
+        print(f"📇 Фільмів в індексі: {len(title_index)}")
+
+
+if __name__ == '__main__':
+    main()
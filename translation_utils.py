@@ -1,18 +1,83 @@
 # translation_utils.py
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
 from googletrans import Translator
 
-translator = Translator()
+from circuit_breaker import breakers, CircuitOpenError
+
+# Таймаут одного запиту до Google Translate, секунди
+TRANSLATE_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", 5))
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", 5000))
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", 4))
+
+translator = Translator(timeout=TRANSLATE_TIMEOUT)
+# Переклади повторюються (тональність, ключові слова), тож кеш знімає частину запитів
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+# Запити до перекладача йдуть в окремих потоках, щоб виклик можна було не чекати довше timeout
+_executor = ThreadPoolExecutor(max_workers=TRANSLATE_WORKERS, thread_name_prefix='translate')
 
-def translate_text(text, target_lang):
+
+def translate_batch(texts, target_lang, timeout=None):
     """
-    Перекладає текст на вказану мову.
-    :param text: рядок тексту
+    Перекладає кілька текстів одним запитом до перекладача.
+    Тексти, які не вдалося перекласти (помилка, розімкнений circuit breaker або вичерпаний
+    timeout), повертаються без змін.
+    :param texts: список рядків
     :param target_lang: цільова мова ('uk', 'en', 'es' тощо)
-    :return: перекладений текст
+    :param timeout: скільки секунд максимум чекати на перекладач (None — без обмеження)
+    :return: переклади в тому ж порядку
     """
+    results = list(texts)
+    missing = []
+    with _cache_lock:
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            key = (text, target_lang)
+            if key in _cache:
+                _cache.move_to_end(key)
+                results[i] = _cache[key]
+            else:
+                missing.append(i)
+    if not missing or (timeout is not None and timeout <= 0):
+        return results
+
+    unique = list(dict.fromkeys(texts[i] for i in missing))
+    future = _executor.submit(breakers['translate'].call, translator.translate, unique, dest=target_lang)
     try:
-        translated = translator.translate(text, dest=target_lang)
-        return translated.text
+        translated = [t.text for t in future.result(timeout)]
+    except FutureTimeout:
+        print(f"⏰ Переклад не встиг за {timeout:.1f} с — повертаємо текст без перекладу")
+        return results
+    except CircuitOpenError:
+        return results
     except Exception as e:
         print(f"❌ Translation error: {e}")
+        return results
+
+    mapping = dict(zip(unique, translated))
+    with _cache_lock:
+        for text, value in mapping.items():
+            _cache[(text, target_lang)] = value
+        while len(_cache) > TRANSLATION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    for i in missing:
+        results[i] = mapping[texts[i]]
+    return results
+
+
+def translate_text(text, target_lang, timeout=None):
+    """
+    Перекладає текст на вказану мову.
+    Якщо перекладач недоступний (помилка, розімкнений circuit breaker або timeout), повертає текст без змін.
+    :param text: рядок тексту
+    :param target_lang: цільова мова ('uk', 'en', 'es' тощо)
+    :return: перекладений текст
+    """
+    if not text:
         return text
+    return translate_batch([text], target_lang, timeout)[0]
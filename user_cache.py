@@ -0,0 +1,103 @@
+# user_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 300))
+
+
+def profile_from_user(user):
+    """
+    Перетворює рядок User на легкий словник профілю (жанри вже розбиті на список).
+    """
+    return {
+        'id': user.id,
+        'username': user.username,
+        'gender': user.gender,
+        'age': user.age,
+        'language': user.language or 'en',
+        'genres': user.genres.split(',') if user.genres else [],
+    }
+
+
+def _key(user_id):
+    # userId приходить з JSON і як число, і як рядок
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class UserProfileCache:
+    """
+    Read-through кеш профілів користувачів з обмеженим розміром (LRU) та TTL.
+
+    Кожна інвалідація отримує номер з лічильника; профіль, читання якого почалося до
+    інвалідації того самого користувача, у кеш не кладеться — інакше застарілий рядок
+    повернувся б у кеш одразу після invalidate.
+    """
+
+    def __init__(self, max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._clock = 0
+        self._invalidated = {}   # user_id → номер останньої інвалідації
+        self._floor = 0          # читання, початі до цього номера, не кешуються (після очищення _invalidated)
+        self._lock = threading.Lock()
+
+    def get(self, user_id, loader):
+        """
+        Повертає профіль з кешу або завантажує його через loader(user_id).
+        :return: словник профілю або None, якщо користувача немає
+        """
+        user_id = _key(user_id)
+        if user_id is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(user_id)
+            if entry and entry[0] > now:
+                self._items.move_to_end(user_id)
+                return entry[1]
+            started = self._clock
+
+        profile = loader(user_id)
+        if profile is not None:
+            with self._lock:
+                if started >= self._floor and self._invalidated.get(user_id, 0) <= started:
+                    self._store(profile)
+        return profile
+
+    def put(self, profile):
+        with self._lock:
+            self._store(profile)
+
+    def _store(self, profile):
+        self._items[profile['id']] = (time.monotonic() + self.ttl, profile)
+        self._items.move_to_end(profile['id'])
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            user_id = _key(user_id)
+            self._items.pop(user_id, None)
+            self._clock += 1
+            self._invalidated[user_id] = self._clock
+            if len(self._invalidated) > self.max_size:
+                # Замість окремих номерів — одна межа: відкидаються всі читання, початі раніше
+                self._invalidated.clear()
+                self._floor = self._clock
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._clock += 1
+            self._invalidated.clear()
+            self._floor = self._clock
+
+
+user_cache = UserProfileCache()
@@ -0,0 +1,343 @@
+# vector_index.py
+import glob
+import json
+import os
+import threading
+
+import numpy as np
+
+VECTOR_N_LISTS = int(os.getenv("VECTOR_N_LISTS", 256))
+VECTOR_N_PROBE = int(os.getenv("VECTOR_N_PROBE", 8))
+VECTOR_FLUSH_EVERY = int(os.getenv("VECTOR_FLUSH_EVERY", 64))
+# Повторний аналіз фільму з майже тим самим ембеддингом не додає новий рядок
+VECTOR_SAME_SIMILARITY = float(os.getenv("VECTOR_SAME_SIMILARITY", 0.999))
+# Файл векторів переписується без мертвих рядків, коли їх частка перевищує поріг
+VECTOR_COMPACT_FRACTION = float(os.getenv("VECTOR_COMPACT_FRACTION", 0.2))
+VECTOR_COMPACT_MIN = int(os.getenv("VECTOR_COMPACT_MIN", 64))
+# Формат ключів у meta.json: старі індекси з ключами-назвами не завантажуються
+KEY_FORMAT = 'movie_id'
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _kmeans(data, k, iterations=10, seed=0):
+    """
+    Сферичний k-means (косинусна схожість) для навчання центроїдів IVF.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        empty = ~sums.any(axis=1)
+        # Порожні кластери перезапускаємо випадковими точками
+        sums[empty] = data[rng.choice(len(data), size=int(empty.sum()))]
+        centroids = _unit(sums)
+    return centroids
+
+
+class VectorIndex:
+    """
+    Approximate nearest neighbour індекс (IVF) над ембеддингами summary.
+
+    Ключ запису — стабільний ідентифікатор фільму (наприклад, 'tmdb:603'), а не введена
+    користувачем назва, тож різне написання однієї назви не дає дублікатів.
+    Вектори лежать у сирому файлі float32 і читаються через np.memmap, нові вектори
+    накопичуються в пам'яті і дописуються в кінець файлу пачками. Поки векторів мало,
+    пошук повний (brute force); після навчання центроїдів переглядаються лише
+    n_probe найближчих списків. Замінені вектори позначаються мертвими.
+
+    Перенавчання IVF і ущільнення файлу (живі рядки переписуються в новий файл, його ім'я —
+    у meta.json) виконуються у фоновому потоці: замок береться лише на короткий знімок
+    на початку і на підміну результату в кінці, тож add і search не чекають на k-means.
+    """
+
+    def __init__(self, directory, dim=384, n_lists=VECTOR_N_LISTS, n_probe=VECTOR_N_PROBE,
+                 flush_every=VECTOR_FLUSH_EVERY):
+        self.directory = directory
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.flush_every = flush_every
+
+        self._vectors_path = os.path.join(directory, 'vectors.f32')
+        self._generation = 0
+        self._meta_path = os.path.join(directory, 'meta.json')
+        self._ivf_path = os.path.join(directory, 'ivf.npz')
+
+        self._base = np.zeros((0, dim), dtype=np.float32)
+        self._pending = []
+        self._keys = []
+        self._titles = []
+        self._rows = {}
+        self._dead = set()
+
+        self._centroids = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._list_rows = None
+        self._list_offsets = None
+        self._trained_size = 0
+
+        self._lock = threading.RLock()
+        self._maintenance = None
+        self.load()
+
+    def __len__(self):
+        return len(self._rows)
+
+    # ————————————————————————————————————————————
+    def load(self):
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('key_format') != KEY_FORMAT:
+            print("⚠️ Індекс схожих фільмів має старий формат ключів — будується заново")
+            return
+        self._generation = meta.get('generation', 0)
+        self._vectors_path = os.path.join(self.directory, meta.get('vectors', 'vectors.f32'))
+        self._keys = meta['keys']
+        self._titles = meta['titles']
+        self._dead = set(meta.get('dead', []))
+        self._rows = {key: row for row, key in enumerate(self._keys) if row not in self._dead}
+        self._map_base(len(self._keys))
+
+        if os.path.exists(self._ivf_path):
+            ivf = np.load(self._ivf_path)
+            self._centroids = ivf['centroids']
+            self._assign = ivf['assign']
+            self._trained_size = int(ivf['trained_size'])
+            self._build_lists()
+
+        # Файли векторів від перерваного ущільнення
+        for path in glob.glob(os.path.join(self.directory, 'vectors*.f32')):
+            if os.path.abspath(path) != os.path.abspath(self._vectors_path):
+                os.remove(path)
+
+    def _map_base(self, n):
+        if n:
+            self._base = np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(n, self.dim))
+        else:
+            self._base = np.zeros((0, self.dim), dtype=np.float32)
+
+    def _build_lists(self):
+        self._list_rows = np.argsort(self._assign, kind='stable').astype(np.int32)
+        counts = np.bincount(self._assign, minlength=len(self._centroids))
+        self._list_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def _save_meta(self):
+        tmp = self._meta_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'key_format': KEY_FORMAT, 'keys': self._keys, 'titles': self._titles,
+                       'dead': sorted(self._dead), 'vectors': os.path.basename(self._vectors_path),
+                       'generation': self._generation}, f)
+        os.replace(tmp, self._meta_path)
+
+    def _save_ivf(self):
+        tmp = self._ivf_path + '.tmp.npz'
+        np.savez(tmp, centroids=self._centroids, assign=self._assign, trained_size=self._trained_size)
+        os.replace(tmp, self._ivf_path)
+
+    def flush(self):
+        """
+        Дописує накопичені вектори у файл і оновлює IVF-списки; перенавчання та ущільнення,
+        якщо вони потрібні, запускаються у фоні.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            new = np.stack(self._pending).astype(np.float32)
+            if os.path.exists(self._vectors_path):
+                # Відрізаємо хвіст, записаний без meta.json (наприклад, після збою)
+                os.truncate(self._vectors_path, len(self._base) * self.dim * 4)
+            with open(self._vectors_path, 'ab') as f:
+                f.write(new.tobytes())
+            self._pending = []
+            self._map_base(len(self._base) + len(new))
+
+            if self._centroids is not None:
+                new_assign = np.argmax(new @ self._centroids.T, axis=1).astype(np.int32)
+                self._assign = np.concatenate([self._assign, new_assign])
+                self._build_lists()
+                self._save_ivf()
+            self._save_meta()
+
+            if (self._needs_compaction() or self._needs_training()) and not self._maintaining():
+                self._maintenance = threading.Thread(target=self._maintain, name='vector-index', daemon=True)
+                self._maintenance.start()
+
+    def _maintaining(self):
+        return self._maintenance is not None and self._maintenance.is_alive()
+
+    def _needs_compaction(self):
+        return len(self._dead) >= VECTOR_COMPACT_MIN and len(self._dead) > VECTOR_COMPACT_FRACTION * len(self._base)
+
+    def _needs_training(self):
+        n = len(self._base)
+        return n >= self.n_lists * 40 and (self._centroids is None or n >= 2 * self._trained_size)
+
+    def _maintain(self):
+        try:
+            with self._lock:
+                compact = self._needs_compaction()
+            if compact:
+                self._compact()
+            with self._lock:
+                train = self._needs_training()
+            if train:
+                self._train()
+        except Exception as e:
+            print(f"❌ Обслуговування індексу схожих фільмів не вдалося: {e}")
+
+    def _compact(self):
+        """
+        Переписує живі рядки в новий файл векторів; рядки, додані під час копіювання,
+        дописуються вже під замком.
+        """
+        with self._lock:
+            base = self._base
+            snapshot = len(base)
+            live = np.array(sorted(row for row in self._rows.values() if row < snapshot), dtype=np.int64)
+            generation = self._generation + 1
+        path = os.path.join(self.directory, f'vectors.{generation}.f32')
+        with open(path, 'wb') as f:
+            for start in range(0, len(live), 8192):
+                f.write(np.asarray(base[live[start:start + 8192]], dtype=np.float32).tobytes())
+
+        with self._lock:
+            flushed = len(self._base)
+            with open(path, 'ab') as f:
+                f.write(np.asarray(self._base[snapshot:flushed], dtype=np.float32).tobytes())
+            # Старий номер рядка → новий: живі рядки знімка, потім усе, що записано й додано після
+            order = np.concatenate([live, np.arange(snapshot, len(self._keys), dtype=np.int64)])
+            remap = {int(old): new for new, old in enumerate(order)}
+            removed = len(self._keys) - len(order)
+            self._keys = [self._keys[row] for row in order]
+            self._titles = [self._titles[row] for row in order]
+            self._rows = {key: remap[row] for key, row in self._rows.items()}
+            self._dead = {remap[row] for row in self._dead if row in remap}
+            if self._centroids is not None:
+                self._assign = np.concatenate([self._assign[live], self._assign[snapshot:flushed]])
+                self._build_lists()
+                self._save_ivf()
+            obsolete, self._vectors_path = self._vectors_path, path
+            self._generation = generation
+            self._map_base(len(live) + flushed - snapshot)
+            self._save_meta()
+        # Старий файл видаляємо лише після того, як meta.json вказує на новий
+        os.remove(obsolete)
+        print(f"🧹 Індекс ущільнено: прибрано {removed} замінених векторів")
+
+    def _train(self):
+        with self._lock:
+            base = self._base
+        n = len(base)
+        rng = np.random.default_rng(0)
+        sample_size = min(n, self.n_lists * 256)
+        sample = np.asarray(base[np.sort(rng.choice(n, size=sample_size, replace=False))])
+        centroids = _kmeans(sample, self.n_lists)
+        assign = np.empty(n, dtype=np.int32)
+        for start in range(0, n, 8192):
+            chunk = np.asarray(base[start:start + 8192])
+            assign[start:start + 8192] = np.argmax(chunk @ centroids.T, axis=1)
+
+        with self._lock:
+            # Рядки, записані під час навчання, розподіляються вже за новими центроїдами
+            tail = np.asarray(self._base[n:])
+            if len(tail):
+                assign = np.concatenate([assign, np.argmax(tail @ centroids.T, axis=1).astype(np.int32)])
+            self._centroids = centroids
+            self._assign = assign
+            self._trained_size = n
+            self._build_lists()
+            self._save_ivf()
+        print(f"🧮 IVF перенавчено: {n} векторів, {self.n_lists} списків")
+
+    # ————————————————————————————————————————————
+    def add(self, key, title, vector):
+        """
+        Додає (або замінює) ембеддинг фільму.
+        :param key: стабільний ідентифікатор фільму, напр. 'tmdb:603'
+        :param title: назва для показу в результатах
+        """
+        if not key:
+            return
+        vector = _unit(np.asarray(vector, dtype=np.float32).reshape(self.dim))
+        with self._lock:
+            old = self._rows.get(key)
+            if old is not None:
+                nb = len(self._base)
+                if old >= nb:
+                    # Ще не записаний у файл — замінюємо на місці
+                    self._pending[old - nb] = vector
+                    self._titles[old] = title
+                    return
+                if float(self._vector_at(old) @ vector) >= VECTOR_SAME_SIMILARITY:
+                    return
+                self._dead.add(old)
+            self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self._titles.append(title)
+            self._pending.append(vector)
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+
+    def _vector_at(self, row):
+        nb = len(self._base)
+        return np.asarray(self._base[row]) if row < nb else self._pending[row - nb]
+
+    def vector_for(self, key):
+        with self._lock:
+            row = self._rows.get(key)
+            return None if row is None else self._vector_at(row)
+
+    def search(self, vector, k=10, exclude_key=None):
+        """
+        Повертає k найближчих фільмів: список словників {'title', 'score'}.
+        """
+        q = _unit(np.asarray(vector, dtype=np.float32).reshape(self.dim))
+
+        with self._lock:
+            exclude = self._rows.get(exclude_key) if exclude_key else None
+            nb = len(self._base)
+            if self._centroids is not None and self._list_rows is not None and nb:
+                probe = np.argpartition(-(self._centroids @ q), min(self.n_probe, len(self._centroids) - 1))
+                probe = probe[:self.n_probe]
+                rows = np.sort(np.concatenate([
+                    self._list_rows[self._list_offsets[c]:self._list_offsets[c + 1]] for c in probe
+                ]))
+                scores = self._base[rows] @ q
+            else:
+                rows = np.arange(nb)
+                scores = self._base @ q if nb else np.zeros(0, dtype=np.float32)
+
+            if self._pending:
+                rows = np.concatenate([rows, np.arange(nb, nb + len(self._pending))])
+                scores = np.concatenate([scores, np.stack(self._pending) @ q])
+
+            if self._dead:
+                alive = ~np.isin(rows, np.fromiter(self._dead, dtype=np.int64, count=len(self._dead)))
+                rows, scores = rows[alive], scores[alive]
+
+            want = min(len(scores), k + 1)
+            if want == 0:
+                return []
+            top = np.argpartition(-scores, want - 1)[:want]
+            top = top[np.argsort(-scores[top])]
+
+            results = []
+            for i in top:
+                row = int(rows[i])
+                if row == exclude:
+                    continue
+                results.append({'title': self._titles[row], 'score': round(float(scores[i]), 4)})
+                if len(results) == k:
+                    break
+            return results